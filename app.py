@@ -1,45 +1,61 @@
 import streamlit as st
-from transformers import pipeline
 import torch
 import os
 import io
 import time
 import soundfile as sf
-import pykakasi
-import difflib
-from jiwer import wer, cer
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from asr_cache import TranscriptionCache
+from asr_models import DEFAULT_BACKEND, INFERENCE_BACKENDS, ModelRegistry
+from batch_eval import evaluate_pipeline, load_evaluation_dataset
+from streaming import stream_transcription
+from audio_utils import TARGET_SAMPLING_RATE, decode_audio_bytes
+from profiling import StageProfiler
+from vad import segment_speech
+from romaji import RomajiTransliterator
+from scheduler import InferenceScheduler, QueueFullError
+from text_diff import DIFF_ROW_CHARS, align_texts, split_opcodes
+from comparison import comparison_entry, measure_assisted_decoding, run_asr_inference, summarize_comparison, transcribe_models_concurrently
 
 # --- FUNGSI UTILITY: HIGHLIGHT PERBEDAAN TEKS ---
-def highlight_diff(text1, text2, label1="Teks 1", label2="Teks 2"):
+def highlight_diff(text1, text2, label1="Teks 1", label2="Teks 2", opcodes=None):
     """
     Membandingkan dua teks karakter demi karakter dan menghasilkan HTML
     yang menyoroti perbedaan dengan warna latar belakang transparan.
+    `opcodes` dari `align_texts` bisa diberikan agar penyejajaran tidak dihitung ulang;
+    teks panjang dipecah menjadi beberapa baris tabel, bukan satu sel raksasa.
     """
     text1 = str(text1 if text1 is not None else "")
     text2 = str(text2 if text2 is not None else "")
 
-    matcher = difflib.SequenceMatcher(None, text1, text2)
-
-    diff_html1 = []
-    diff_html2 = []
-
-    for opcode, a_start, a_end, b_start, b_end in matcher.get_opcodes():
-        if opcode == 'equal':
-            diff_html1.append(text1[a_start:a_end])
-            diff_html2.append(text2[b_start:b_end])
-        elif opcode == 'replace':
-            deleted_part = f"<span style='background-color: rgba(255, 120, 120, 0.3);'>{text1[a_start:a_end]}</span>"
-            inserted_part = f"<span style='background-color: rgba(120, 255, 120, 0.3);'>{text2[b_start:b_end]}</span>"
-            diff_html1.append(deleted_part)
-            diff_html2.append(inserted_part)
-        elif opcode == 'delete':
-            deleted_part = f"<span style='background-color: rgba(255, 120, 120, 0.3); text-decoration: line-through;'>{text1[a_start:a_end]}</span>"
-            diff_html1.append(deleted_part)
-            diff_html2.append(f"<span style='color: #888888; font-style: italic;'>[{' ' * max(1, a_end - a_start)}]</span>")
-        elif opcode == 'insert':
-            inserted_part = f"<span style='background-color: rgba(120, 255, 120, 0.3);'><u>{text2[b_start:b_end]}</u></span>"
-            diff_html1.append(f"<span style='color: #888888; font-style: italic;'>[{' ' * max(1, b_end - b_start)}]</span>")
-            diff_html2.append(inserted_part)
+    if opcodes is None:
+        opcodes = align_texts(text1, text2)["opcodes"]
+
+    table_rows = []
+    for segment in split_opcodes(opcodes):
+        diff_html1 = []
+        diff_html2 = []
+
+        for opcode, a_start, a_end, b_start, b_end in segment:
+            if opcode == 'equal':
+                diff_html1.append(text1[a_start:a_end])
+                diff_html2.append(text2[b_start:b_end])
+            elif opcode == 'replace':
+                deleted_part = f"<span style='background-color: rgba(255, 120, 120, 0.3);'>{text1[a_start:a_end]}</span>"
+                inserted_part = f"<span style='background-color: rgba(120, 255, 120, 0.3);'>{text2[b_start:b_end]}</span>"
+                diff_html1.append(deleted_part)
+                diff_html2.append(inserted_part)
+            elif opcode == 'delete':
+                deleted_part = f"<span style='background-color: rgba(255, 120, 120, 0.3); text-decoration: line-through;'>{text1[a_start:a_end]}</span>"
+                diff_html1.append(deleted_part)
+                diff_html2.append(f"<span style='color: #888888; font-style: italic;'>[{' ' * max(1, a_end - a_start)}]</span>")
+            elif opcode == 'insert':
+                inserted_part = f"<span style='background-color: rgba(120, 255, 120, 0.3);'><u>{text2[b_start:b_end]}</u></span>"
+                diff_html1.append(f"<span style='color: #888888; font-style: italic;'>[{' ' * max(1, b_end - b_start)}]</span>")
+                diff_html2.append(inserted_part)
+
+        table_rows.append(f"<tr><td>{''.join(diff_html1)}</td><td>{''.join(diff_html2)}</td></tr>")
 
     html_output = f"""
     <style>
@@ -95,10 +111,7 @@ def highlight_diff(text1, text2, label1="Teks 1", label2="Teks 2"):
             </tr>
         </thead>
         <tbody>
-            <tr>
-                <td>{''.join(diff_html1)}</td>
-                <td>{''.join(diff_html2)}</td>
-            </tr>
+            {''.join(table_rows) or "<tr><td></td><td></td></tr>"}
         </tbody>
     </table>
     """
@@ -106,163 +119,463 @@ def highlight_diff(text1, text2, label1="Teks 1", label2="Teks 2"):
 
 
 # --- FUNGSI PEMROSESAN AUDIO DAN TRANSKRIPSI ---
-def process_audio_with_model(audio_file_path, asr_pipeline, model_label, pykakasi_converter, pykakasi_initialized):
+def measure_backend_drift(audio_input, model_id, model_registry, backends, scheduler=None):
+    """
+    Mentranskripsi audio yang sama dengan beberapa backend inferensi secara berurutan (tanpa cache)
+    dan membandingkan latensi serta pergeseran CER terhadap baseline backend bawaan (PyTorch; float32
+    di CPU, float16 di GPU). Dtype setiap backend dicantumkan di tabel. Setiap backend dipanaskan dulu
+    dengan potongan audio 1 detik agar biaya panggilan pertama tidak ikut terukur. Jika `scheduler`
+    diberikan, pengukuran setiap backend dijalankan sebagai pekerjaan eksklusif di antrean model tersebut.
+    Mengembalikan list baris tabel.
+    """
+    warmup_input = {"raw": audio_input["raw"][:audio_input["sampling_rate"]], "sampling_rate": audio_input["sampling_rate"]}
+    ordered_backends = [DEFAULT_BACKEND] + [backend for backend in backends if backend != DEFAULT_BACKEND]
+
+    rows = []
+    baseline_result = None
+    for backend in ordered_backends:
+        dtype_name = model_registry.get_dtype_name(model_id, backend)
+        try:
+            def measure_backend(backend=backend):
+                run_asr_inference(warmup_input, model_id, model_registry, backend=backend)
+                return run_asr_inference(audio_input, model_id, model_registry, backend=backend)
+
+            inference_result = scheduler.run_exclusive(model_id, measure_backend, backend) if scheduler is not None else measure_backend()
+        except Exception as e:
+            rows.append({"Backend": INFERENCE_BACKENDS[backend], "Dtype": dtype_name, "Latensi (detik)": None, "Percepatan": None, "Pergeseran CER (%)": None, "Catatan": f"Gagal: {e}"})
+            continue
+
+        if baseline_result is None and backend == DEFAULT_BACKEND:
+            baseline_result = inference_result
+
+        speedup = None
+        cer_drift = None
+        if baseline_result is not None:
+            if inference_result["duration"] > 0:
+                speedup = round(baseline_result["duration"] / inference_result["duration"], 2)
+            baseline_text = baseline_result["text"].strip()
+            if baseline_text:
+                cer_drift = round(align_texts(baseline_text, inference_result["text"].strip())["cer"] * 100, 2)
+
+        rows.append({
+            "Backend": INFERENCE_BACKENDS[backend],
+            "Dtype": dtype_name,
+            "Latensi (detik)": round(inference_result["duration"], 2),
+            "Percepatan": speedup,
+            "Pergeseran CER (%)": cer_drift,
+            "Catatan": f"Baseline ({dtype_name})" if backend == DEFAULT_BACKEND else "",
+        })
+    return rows
+
+
+def display_stage_profile(model_label, inference_result):
+    """Menampilkan rincian waktu/memori per tahap dan tombol unduh trace profiler, jika ada."""
+    stages = inference_result.get("stages")
+    if not stages:
+        return
+    st.caption("Rincian tahap: " + " · ".join(f"{stage_name} {stage['duration'] * 1000:.0f} ms (puncak RSS {stage['peak_rss_mb']:.0f} MB)" for stage_name, stage in stages.items()))
+    trace_path = inference_result.get("trace_path")
+    if trace_path and os.path.exists(trace_path):
+        with open(trace_path, "rb") as f:
+            st.download_button(f"⬇️ Unduh trace profiler {model_label}", data=f.read(), file_name=os.path.basename(trace_path), mime="application/json")
+
+
+def display_speech_segments(inference_result):
+    """Menampilkan teks per segmen ucapan (hasil VAD) beserta waktunya pada audio asli, jika ada."""
+    segments = inference_result.get("segments")
+    if segments:
+        st.markdown("**Segmen ucapan (VAD):**")
+        st.dataframe([
+            {"Mulai": f"{segment['start']:.2f} dtk", "Selesai": f"{segment['end']:.2f} dtk", "Teks": segment["text"]}
+            for segment in segments
+        ], use_container_width=True)
+
+
+def format_timing(inference_result):
+    """Teks waktu transkripsi beserta status cache (HIT/MISS) untuk ditampilkan di UI."""
+    timing_text = f"Waktu Transkripsi: **{inference_result['duration']:.2f} detik**"
+    if inference_result.get("cache_hit"):
+        timing_text += f" · 🗄️ Cache **HIT** (inferensi asli {inference_result['inference_duration']:.2f} detik)"
+    elif inference_result.get("cache_hit") is False:
+        timing_text += " · 🗄️ Cache **MISS**"
+    if inference_result.get("batch_size", 1) > 1 or inference_result.get("queue_wait", 0.0) >= 0.1:
+        timing_text += f" · 🚦 menunggu antrean {inference_result['queue_wait']:.2f} detik, batch {inference_result['batch_size']} permintaan"
+    return timing_text
+
+
+def display_transcription_result(model_label, inference_result, romaji_transliterator, error=None, show_status=True):
+    """
+    Menampilkan hasil transkripsi (Kanji/Kana dan Romaji) serta waktu untuk satu model.
+    `show_status=False` jika judul dan status selesai sudah ditampilkan pemanggil.
+    """
+    if show_status:
+        st.subheader(f"Hasil dari: {model_label}")
+
+    transcription_japanese = inference_result["text"]
+    if isinstance(error, QueueFullError):
+        st.warning(f"🚦 Server sedang sibuk: {error}")
+    elif error is not None:
+        st.error(f"❌ Terjadi kesalahan saat transkripsi dengan {model_label}: {error}")
+        st.exception(error)
+    else:
+        if show_status:
+            st.success(f"✅ Transkripsi {model_label} Selesai!")
+        st.write(format_timing(inference_result))
+        display_stage_profile(model_label, inference_result)
+
+    st.markdown(f"**Transkripsi dari {model_label}:**")
+    with st.expander(f"Lihat detail transkripsi {model_label}"):
+        st.markdown("**Kanji/Kana:**")
+        st.code(transcription_japanese)
+        st.markdown("**Romaji:**")
+        romaji_text = romaji_transliterator.transliterate(transcription_japanese) if romaji_transliterator.initialized else "Transliterasi Romaji tidak tersedia."
+        st.code(romaji_text)
+        display_speech_segments(inference_result)
+
+    st.write("---")
+
+
+def process_audio_with_model(audio_input, model_id, model_registry, model_label, romaji_transliterator, transcription_cache=None, backend=None, profile_stages=False, export_trace=False,
+                             scheduler=None, speech=None):
     """
-    Memproses file audio menggunakan pipeline ASR yang diberikan
+    Memproses audio menggunakan model ASR dari registry
     dan menampilkan hasil transkripsi (Kanji/Kana dan Romaji) serta waktu.
+    Jika `scheduler` diberikan, posisi antrean ditampilkan selama permintaan menunggu.
+    Mengembalikan dict hasil inferensi (lihat `run_asr_inference`).
     """
     st.subheader(f"Hasil dari: {model_label}")
 
-    transcription_japanese = ""
-    duration_asr = 0.0
-
+    error = None
     try:
         if hasattr(st, 'status'):
             with st.status(f"⏳ Sedang mentranskripsi audio dengan {model_label}...", expanded=True) as status_box:
-                start_time_asr = time.time()
-                result = asr_pipeline(audio_file_path)
-                transcription_japanese = result["text"]
-                end_time_asr = time.time()
-                duration_asr = end_time_asr - start_time_asr
+                def show_queue_position(position):
+                    if position > 0:
+                        status_box.update(label=f"🚦 {model_label}: menunggu antrean (posisi {position})...")
+                    else:
+                        status_box.update(label=f"⏳ Sedang mentranskripsi audio dengan {model_label}...")
+
+                inference_result = run_asr_inference(
+                    audio_input, model_id, model_registry, transcription_cache=transcription_cache,
+                    backend=backend, profile_stages=profile_stages, export_trace=export_trace,
+                    scheduler=scheduler, on_queue_position=show_queue_position, speech=speech,
+                )
                 status_box.update(label=f"✅ Transkripsi {model_label} Selesai!", state="complete", expanded=False)
-                st.write(f"Waktu Transkripsi: **{duration_asr:.2f} detik**")
         else: # Fallback untuk Streamlit versi lama
             with st.spinner(f"⏳ Sedang mentranskripsi audio dengan {model_label}..."):
-                start_time_asr = time.time()
-                result = asr_pipeline(audio_file_path)
-                transcription_japanese = result["text"]
-                end_time_asr = time.time()
-                duration_asr = end_time_asr - start_time_asr
-                st.success("✅ Transkripsi Jepang Selesai!")
-                st.write(f"Waktu Transkripsi: **{duration_asr:.2f} detik**")
-
+                inference_result = run_asr_inference(
+                    audio_input, model_id, model_registry, transcription_cache=transcription_cache,
+                    backend=backend, profile_stages=profile_stages, export_trace=export_trace,
+                    scheduler=scheduler, speech=speech,
+                )
+            st.success("✅ Transkripsi Jepang Selesai!")
     except Exception as e:
-        st.error(f"❌ Terjadi kesalahan saat transkripsi dengan {model_label}: {e}")
-        st.exception(e)
-        transcription_japanese = "Error saat transkripsi."
-        duration_asr = 0.0
+        error = e
+        inference_result = {"text": "Error saat transkripsi.", "duration": 0.0, "cache_hit": None, "inference_duration": 0.0}
 
-    st.markdown(f"**Transkripsi dari {model_label}:**")
-    with st.expander(f"Lihat detail transkripsi {model_label}"):
-        st.markdown("**Kanji/Kana:**")
-        st.code(transcription_japanese)
-        st.markdown("**Romaji:**")
-        romaji_text = pykakasi_converter.do(transcription_japanese) if pykakasi_initialized else "Transliterasi Romaji tidak tersedia."
-        st.code(romaji_text)
+    display_transcription_result(model_label, inference_result, romaji_transliterator, error, show_status=False)
+    return inference_result
 
+
+def run_long_form_comparison(audio_source, labeled_models, model_registry, chunk_length_s, stride_length_s, run_concurrently=True, scheduler=None):
+    """
+    Mentranskripsi audio panjang per potongan dengan semua model secara serempak, dan
+    menambahkan teks parsial serta perbedaan per potongan ke halaman begitu setiap potongan selesai.
+    `audio_source` adalah fungsi yang mengembalikan path/objek file baru, karena setiap model
+    membaca audionya sendiri secara lazy. `labeled_models` berisi tuple (label, model_id, backend).
+    Jika `scheduler` diberikan, setiap potongan dijalankan sebagai pekerjaan eksklusif di antrean
+    model tersebut (antrean, backpressure, dan anggaran thread penjadwal).
+    Mengembalikan dict {label: (teks, durasi)}.
+    """
+    labels = [label for label, _, _ in labeled_models]
+    streams = [
+        stream_transcription(model_registry.get_pipeline(model_id, backend), audio_source(), chunk_length_s, stride_length_s, model_registry.get_generate_kwargs(model_id))
+        for _, model_id, backend in labeled_models
+    ]
+
+    def next_chunk(stream_index):
+        stream = streams[stream_index]
+        if scheduler is None:
+            return next(stream, None)
+        _, model_id, backend = labeled_models[stream_index]
+        return scheduler.run_exclusive(model_id, lambda: next(stream, None), backend)
+    latest = {label: {"text": "", "duration": 0.0} for label in labels}
+
+    progress_placeholder = st.empty()
+    text_columns = st.columns(len(labels))
+    text_placeholders = []
+    for column, label in zip(text_columns, labels):
+        with column:
+            st.markdown(f"**{label}**")
+            text_placeholders.append(st.empty())
+    st.markdown("#### Perbedaan per Potongan")
+    chunk_diff_container = st.container()
+
+    executor = None
+    if run_concurrently and scheduler is not None:
+        # Thread di sini hanya menunggu; inferensi berjalan di pekerja penjadwal
+        executor = ThreadPoolExecutor(max_workers=len(labels))
+    elif run_concurrently:
+        threads_per_model = max(1, (os.cpu_count() or 1) // len(labels))
+        executor = ThreadPoolExecutor(max_workers=len(labels), initializer=torch.set_num_threads, initargs=(threads_per_model,))
+    try:
+        while True:
+            if executor is not None:
+                chunk_results = list(executor.map(next_chunk, range(len(streams))))
+            else:
+                chunk_results = [next_chunk(stream_index) for stream_index in range(len(streams))]
+            if all(chunk_result is None for chunk_result in chunk_results):
+                break
+
+            for label, placeholder, chunk_result in zip(labels, text_placeholders, chunk_results):
+                if chunk_result is not None:
+                    latest[label] = chunk_result
+                    placeholder.code(chunk_result["text"])
+
+            reference_chunk = next(chunk_result for chunk_result in chunk_results if chunk_result is not None)
+            progress_placeholder.info(f"⏳ Potongan ke-{reference_chunk['chunk_index'] + 1} selesai (audio hingga {reference_chunk['end']:.0f} detik).")
+            with chunk_diff_container:
+                st.caption(f"Potongan {reference_chunk['chunk_index'] + 1}: {reference_chunk['start']:.0f}–{reference_chunk['end']:.0f} detik")
+                chunk_texts = [chunk_result["chunk_text"] if chunk_result is not None else "" for chunk_result in chunk_results]
+                # Model pertama menjadi acuan perbandingan untuk model lainnya
+                for other_label, other_text in zip(labels[1:], chunk_texts[1:]):
+                    st.markdown(highlight_diff(chunk_texts[0], other_text, labels[0], other_label), unsafe_allow_html=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    progress_placeholder.success("✅ Transkripsi audio panjang selesai!")
+    for label in labels:
+        st.write(f"Waktu Transkripsi {label}: **{latest[label]['duration']:.2f} detik**")
     st.write("---")
+    return {label: (latest[label]["text"], latest[label]["duration"]) for label in labels}
 
-    return transcription_japanese, duration_asr
 
+# --- FUNGSI KESIMPULAN PERBANDINGAN ---
+# Jumlah baris tabel perbedaan per halaman, dan batas jumlah halaman per pasangan model
+DIFF_ROWS_PER_PAGE = 10
+DIFF_MAX_PAGES = 20
 
-# --- KONFIGURASI UMUM DAN INISIALISASI DI AWAL SKRIP ---
-# Variabel global untuk nama model
-MODEL_WHISPER_BASE = "openai/whisper-base"
-MODEL_ANIME_WHISPER = "litagin/anime-whisper"
 
-# Inisialisasi PYKAKASI (HARUS SEBELUM st.set_page_config)
-PYKAKASI_INITIALIZED = False
-kakasi_converter = None
-try:
-    kks_obj = pykakasi.kakasi()
-    # Menggunakan setMode untuk kompatibilitas dengan pykakasi v2.x
-    # Ini akan memicu DeprecationWarning, tapi fungsionalitas tetap berjalan.
-    kks_obj.setMode("H", "a") # Hiragana to Alphabet
-    kks_obj.setMode("K", "a") # Katakana to Alphabet
-    kks_obj.setMode("J", "a") # Kanji to Alphabet
-    kks_obj.setMode("r", "Hepburn") # Romaji system (paling umum)
-    kakasi_converter = kks_obj.getConverter()
-    PYKAKASI_INITIALIZED = True
-except Exception as e:
-    # Menggunakan print() karena st.warning() tidak bisa dipanggil di sini
-    print(f"Peringatan: Gagal menginisialisasi pykakasi untuk transliterasi Romaji: {e}")
-    print("Transliterasi Romaji tidak akan tersedia. Pastikan `pykakasi` terinstal dengan benar.")
-    class DummyConverter: # Dummy converter jika pykakasi gagal
-        def do(self, text):
-            return text
-    kakasi_converter = DummyConverter()
+def render_paginated_diff(text1, text2, label1, label2, alignment, key):
+    """
+    Menampilkan tabel perbedaan dua teks. Teks panjang dibagi ke beberapa halaman dan hanya
+    halaman yang dipilih yang dikirim ke browser, agar browser tidak menerima satu tabel
+    raksasa sekaligus. `key` membedakan pemilih halaman antar pasangan model.
+    """
+    segments = split_opcodes(alignment["opcodes"])
+    rows_per_page = max(DIFF_ROWS_PER_PAGE, -(-len(segments) // DIFF_MAX_PAGES))
+    pages = [segments[start:start + rows_per_page] for start in range(0, len(segments), rows_per_page)] or [[]]
+    if len(pages) == 1:
+        st.markdown(highlight_diff(text1, text2, label1, label2, alignment["opcodes"]), unsafe_allow_html=True)
+        return
+
+    page_index = st.selectbox(
+        f"Teks panjang: perbedaan ditampilkan dalam {len(pages)} halaman (±{rows_per_page * DIFF_ROW_CHARS} karakter per halaman).",
+        options=range(len(pages)),
+        format_func=lambda index: f"Hal. {index + 1}",
+        key=key,
+    )
+    page_opcodes = [opcode for segment in pages[page_index] for opcode in segment]
+    st.markdown(highlight_diff(text1, text2, label1, label2, page_opcodes), unsafe_allow_html=True)
+
+
+def get_comparison_analysis(results, romaji_transliterator=None):
+    """
+    Penyejajaran per pasangan (acuan vs model lain) dan ringkasan perbandingan untuk `results`.
+    Keduanya dihitung sekali per hasil (dan per tingkat CER) lalu disimpan di session_state,
+    sehingga rerun tanpa perbandingan baru (mis. saat halaman tabel perbedaan diganti) tidak
+    menyejajarkan atau mentransliterasi ulang teks panjang.
+    """
+    analysis = st.session_state.comparison_analysis
+    if analysis.get("results") is not results:
+        analysis.clear()
+        analysis["results"] = results
+        cleaned_texts = [result["text"].strip() for result in results]
+        analysis["alignments"] = [align_texts(cleaned_texts[0], other_text) for other_text in cleaned_texts[1:]]
+    summary_key = "summary_romaji" if romaji_transliterator is not None else "summary"
+    if summary_key not in analysis:
+        analysis[summary_key] = summarize_comparison(results, romaji_transliterator, analysis["alignments"])
+    return analysis["alignments"], analysis[summary_key]
+
+
+def render_comparison_summary(results, romaji_transliterator=None):
+    """
+    Menampilkan perbandingan langsung dan kesimpulan otomatis untuk N model.
+    `results` adalah list dict {"label", "text", "duration", "cache_hit"} (lihat `comparison_entry`);
+    model pertama menjadi acuan.
+    Jika `romaji_transliterator` diberikan, CER dan jumlah S/D/I dihitung pada tingkat Romaji.
+    """
+    reference = results[0]
+    cleaned_texts = [result["text"].strip() for result in results]
+    # Satu penyejajaran per pasangan dipakai untuk penyorotan, jumlah S/D/I, dan CER
+    alignments, summary = get_comparison_analysis(results, romaji_transliterator)
+
+    st.markdown("### Perbandingan Langsung Transkripsi (Kanji/Kana)")
+    for index, (other, other_text, alignment) in enumerate(zip(results[1:], cleaned_texts[1:], alignments)):
+        with st.expander(f"{reference['label']} vs {other['label']}", expanded=index == 0):
+            render_paginated_diff(cleaned_texts[0], other_text, reference["label"], other["label"], alignment, key=f"diff_page_{index}")
+
+    st.markdown("---")
+    st.header("3. Kesimpulan Perbandingan Otomatis")
+
+    # Perbandingan Waktu Transkripsi
+    st.subheader("📊 Perbandingan Waktu Transkripsi:")
+    sorted_by_duration = sorted(results, key=lambda result: result["duration"])
+    fastest, slowest = sorted_by_duration[0], sorted_by_duration[-1]
+    faster_model, slower_model = summary["fastest"], summary["slowest"]
+
+    st.info(f"**{faster_model}** menyelesaikan transkripsi dalam **{fastest['duration']:.2f} detik**, sedangkan **{slower_model}** membutuhkan **{slowest['duration']:.2f} detik**. Ini berarti {faster_model} lebih cepat sekitar **{summary['speed_diff_percent']:.2f}%** pada audio ini.")
+    if summary["cached"]:
+        st.caption(f"🗄️ Hasil dari cache ({', '.join(summary['cached'])}): yang dibandingkan adalah waktu inferensi asli yang tersimpan, bukan waktu pencarian cache.")
+    if len(results) > 2:
+        st.dataframe(
+            pd.DataFrame({"Waktu Transkripsi (detik)": [round(result["duration"], 2) for result in sorted_by_duration]},
+                         index=[result["label"] for result in sorted_by_duration]),
+            use_container_width=True,
+        )
+
+    profiled_results = [result for result in results if result.get("stages")]
+    if profiled_results:
+        st.markdown("**Rincian waktu per tahap (ms):**")
+        stage_names = list(dict.fromkeys(stage_name for result in profiled_results for stage_name in result["stages"]))
+        stage_durations_ms = pd.DataFrame(
+            [[result["stages"][stage_name]["duration"] * 1000 if stage_name in result["stages"] else 0.0 for stage_name in stage_names] for result in profiled_results],
+            index=[result["label"] for result in profiled_results],
+            columns=stage_names,
+        )
+        st.bar_chart(stage_durations_ms)
+        st.dataframe(
+            pd.DataFrame(
+                [[round(result["stages"][stage_name]["peak_rss_mb"]) if stage_name in result["stages"] else None for stage_name in stage_names] for result in profiled_results],
+                index=[result["label"] for result in profiled_results],
+                columns=[f"Puncak RSS {stage_name} (MB)" for stage_name in stage_names],
+            ),
+            use_container_width=True,
+        )
+
+    # Perbandingan Akurasi (Character Error Rate - CER)
+    st.subheader("⚖️ Perbandingan Kesamaan Teks (antar model):")
+
+    if romaji_transliterator is not None:
+        st.caption("CER dan jumlah operasi dihitung pada tingkat Romaji (tanpa spasi dan tanda baca), sehingga perbedaan penulisan Kanji/Kana dengan bacaan yang sama tidak dihitung sebagai kesalahan.")
+
+    if summary["average_cer"] is not None:
+        try:
+            cer_matrix = summary["cer_matrix"]
+            character_error_rate = summary["average_cer"]
+
+            if len(results) == 2:
+                st.metric("Character Error Rate (CER)", f"{cer_matrix[0][1] if cer_matrix[0][1] is not None else 100.0:.2f}%", help="Persentase karakter yang berbeda antara dua transkripsi. Dihitung sebagai (Substitusi + Penghapusan + Penambahan) / Total Karakter Referensi. Semakin rendah, semakin mirip.")
+            else:
+                st.markdown("**Matriks CER antar model (%)** — baris sebagai referensi, kolom sebagai hipotesis:")
+                labels = [result["label"] for result in results]
+                st.dataframe(
+                    pd.DataFrame([[round(value, 2) if value is not None else None for value in row] for row in cer_matrix], index=labels, columns=labels),
+                    use_container_width=True,
+                )
+                st.metric("Rata-rata CER antar model", f"{character_error_rate:.2f}%", help="Rata-rata CER dari semua pasangan model. Semakin rendah, semakin mirip transkripsi antar model.")
+
+            for pair in summary["pairs"]:
+                pair_text = "kedua transkripsi" if len(results) == 2 else f"**{reference['label']}** dan **{pair['hypothesis']}**"
+                st.info(f"Ditemukan **{pair['substitutions']}** penggantian, **{pair['deletions']}** penghapusan, dan **{pair['insertions']}** penambahan karakter antara {pair_text}.")
+
+            st.markdown("#### 📝 Ringkasan Umum:")
+            summary_text = ""
+            if character_error_rate < 5:
+                summary_text += "Model-model yang dibandingkan menghasilkan transkripsi yang sangat mirip dengan tingkat kesalahan karakter yang rendah. Ini menunjukkan konsistensi tinggi."
+            elif character_error_rate < 20:
+                summary_text += "Model-model yang dibandingkan menunjukkan kemiripan yang cukup, namun ada beberapa perbedaan karakter. Mungkin salah satu model lebih baik untuk nuansa tertentu atau istilah spesifik."
+            else:
+                summary_text += "Ada perbedaan signifikan antara transkripsi model-model yang dibandingkan. Ini mungkin mengindikasikan bahwa model yang di-fine-tune pada domain tertentu (mis. 'litagin/anime-whisper' untuk anime) memiliki bias yang berbeda atau dilatih pada dataset yang sangat spesifik, yang mungkin tidak cocok untuk semua jenis audio Jepang, atau sebaliknya."
+
+            summary_text += f"\n\nDalam hal kecepatan, **{faster_model}** secara signifikan lebih cepat daripada **{slower_model}** untuk audio ini."
+
+            st.markdown(summary_text)
+
+        except ValueError as ve:
+            st.warning(f"Tidak dapat menghitung CER atau analisis perbedaan: {ve}. Ini mungkin terjadi jika transkripsi menghasilkan teks yang sangat tidak biasa atau kosong.")
+            st.info("Pastikan output transkripsi adalah teks yang valid. Anda dapat memeriksa detail log untuk informasi lebih lanjut.")
+    else:
+        st.warning("Tidak dapat menghitung Character Error Rate (CER) atau ringkasan karena semua transkripsi (setelah pembersihan) kosong.")
 
 
 # --- KONFIGURASI HALAMAN STREAMLIT (HARUS JADI YANG PERTAMA) ---
 st.set_page_config(layout="wide", page_title="Perbandingan ASR Audio Jepang")
 
 st.title("🗣️ Perbandingan Model ASR Audio Jepang")
-st.markdown("Unggah file audio berbahasa Jepang untuk membandingkan transkripsi dari dua model Whisper, serta mendapatkan Romaji dan analisis perbandingan.")
+st.markdown("Unggah file audio berbahasa Jepang untuk membandingkan transkripsi dari beberapa model Whisper, serta mendapatkan Romaji dan analisis perbandingan.")
 st.markdown("---")
 
 
-# --- MUAT MODEL ASR (SETELAH st.set_page_config) ---
+# --- REGISTRY MODEL ASR (SETELAH st.set_page_config) ---
 @st.cache_resource
-def load_asr_models_cached():
-    """Wrapper untuk memuat kedua model ASR dengan caching."""
-    # Menentukan perangkat GPU/CPU
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    device_id = 0 if device == "cuda" else -1
-
-    # Tentukan torch_dtype untuk optimasi GPU (float16)
-    torch_dtype = torch.float16 if device == "cuda" else torch.float32
-
-    # Fungsi internal untuk memuat satu model
-    def _load_single_model(model_name_param):
-        # MENGHAPUS st.info/st.success DI SINI AGAR TIDAK MUNCUL KOTAK NOTIFIKASI
-        try:
-            pipe = pipeline(
-                "automatic-speech-recognition",
-                model=model_name_param,
-                device=device_id,
-                torch_dtype=torch_dtype,
-                model_kwargs={"low_cpu_mem_usage": True, "use_safetensors": True}
-            )
-            return pipe
-        except Exception as e:
-            st.error(f"❌ Gagal memuat model '{model_name_param}': {e}")
-            st.info("Ini mungkin karena masalah jaringan, kurang memori, atau model tidak tersedia.")
-            st.stop() # Hentikan aplikasi jika model penting tidak bisa dimuat
-            return None
+def get_model_registry():
+    """Registry model dibagikan ke semua sesi; model baru dimuat saat pertama kali dipakai."""
+    return ModelRegistry.from_config()
 
-    asr_pipeline_base_local = _load_single_model(MODEL_WHISPER_BASE)
-    anime_whisper_pipeline_local = _load_single_model(MODEL_ANIME_WHISPER)
-    return asr_pipeline_base_local, anime_whisper_pipeline_local
+@st.cache_resource
+def get_inference_scheduler():
+    """Penjadwal inferensi bersama: antrean per model agar klik bersamaan dari banyak sesi tidak berebut pipeline."""
+    return InferenceScheduler(get_model_registry())
+
+@st.cache_resource
+def get_romaji_transliterator():
+    """Transliterasi Romaji (pykakasi) dibagikan ke semua sesi; cache per kalimat bertahan antar rerun."""
+    return RomajiTransliterator()
+
+@st.cache_resource
+def get_transcription_cache():
+    """Cache hasil transkripsi di disk, dibagikan ke semua sesi dan bertahan saat server dimulai ulang."""
+    try:
+        return TranscriptionCache()
+    except Exception as e:
+        print(f"Peringatan: Gagal menyiapkan cache transkripsi: {e}")
+        return None
+
+try:
+    model_registry = get_model_registry()
+except Exception as e:
+    st.error(f"❌ Gagal membaca konfigurasi registry model: {e}")
+    st.info("Periksa file `models.json` (atau path pada variabel lingkungan `ASR_MODELS_CONFIG`).")
+    st.stop()
 
-# Tampilkan spinner utama saat memuat model
-with st.spinner("⏳ Memuat model AI untuk Automatic Speech Recognition (ASR)... Ini mungkin butuh beberapa saat, tergantung ukuran model dan koneksi internet."):
-    asr_pipeline_base, anime_whisper_pipeline = load_asr_models_cached()
+romaji_transliterator = get_romaji_transliterator()
+inference_scheduler = get_inference_scheduler()
 
 
-# Inisialisasi session_state untuk menyimpan hasil transkripsi dan durasi
-if 'base_transcript' not in st.session_state:
-    st.session_state.base_transcript = ""
-if 'anime_transcript' not in st.session_state:
-    st.session_state.anime_transcript = ""
-if 'base_duration' not in st.session_state:
-    st.session_state.base_duration = 0.0
-if 'anime_duration' not in st.session_state:
-    st.session_state.anime_duration = 0.0
+# Inisialisasi session_state untuk menyimpan hasil transkripsi dan durasi setiap model
+if 'comparison_results' not in st.session_state:
+    st.session_state.comparison_results = []
+# Penyejajaran dan ringkasan untuk comparison_results (lihat get_comparison_analysis)
+if 'comparison_analysis' not in st.session_state:
+    st.session_state.comparison_analysis = {}
 
 
 # Tabs untuk navigasi aplikasi
-tab1, tab2 = st.tabs(["Aplikasi Utama", "Tentang Proyek Ini"])
+tab1, tab_corpus, tab2 = st.tabs(["Aplikasi Utama", "Evaluasi Korpus", "Tentang Proyek Ini"])
 
 with tab1: # Konten utama aplikasi
     st.header("1. Unggah File Audio Bahasa Jepang")
     uploaded_file = st.file_uploader(
         "Pilih file audio (.wav, .mp3, .flac) berbahasa Jepang:",
-        type=["wav", "mp3", "flac"]
+        type=["wav", "mp3", "flac"],
+        # Kesimpulan dari audio sebelumnya tidak berlaku lagi untuk audio baru
+        on_change=lambda: st.session_state.update(comparison_results=[]),
     )
 
-    audio_path = None
+    audio_bytes = None
     if uploaded_file is not None:
         st.audio(uploaded_file, format=uploaded_file.type)
 
         try:
-            audio_path = "temp_uploaded_audio.wav"
-            with open(audio_path, "wb") as f:
-                f.write(uploaded_file.read())
+            # Audio disimpan di memori per sesi (tanpa file sementara bersama di disk)
+            audio_bytes = uploaded_file.getvalue()
             st.success("✅ File audio berhasil diunggah. Klik 'Mulai Perbandingan!'")
         except Exception as e:
             st.error(f"❌ Error membaca file audio: {e}")
             st.info("Pastikan format file audio kompatibel dan tidak korup. Coba unggah file lain.")
-            audio_path = None
+            audio_bytes = None
     else:
         st.info("👆 Silakan unggah file audio berbahasa Jepang untuk memulai proses.")
 
@@ -270,91 +583,317 @@ with tab1: # Konten utama aplikasi
     st.markdown("---")
     st.header("2. Hasil Perbandingan Transkripsi & Romaji")
 
+    selected_model_ids = st.multiselect(
+        "Model yang dibandingkan:",
+        options=list(model_registry.specs),
+        default=model_registry.default_model_ids(),
+        format_func=model_registry.get_label,
+        help="Daftar model diambil dari `models.json`. Model dimuat saat pertama kali dipakai; jika anggaran memori terlampaui, model yang paling lama tidak dipakai dikeluarkan dari memori. Model pertama menjadi acuan perbandingan."
+    )
+    with st.expander("⚙️ Backend inferensi per model"):
+        st.caption("int8 mengkuantisasi lapisan linear secara dinamis (CPU). bfloat16 paling efektif di CPU dengan dukungan AVX512-BF16/AMX. ONNX Runtime membutuhkan paket `optimum[onnxruntime]` dan mengekspor model saat pertama kali dipakai.")
+        model_backends = {}
+        for model_id in selected_model_ids:
+            backend_options = list(INFERENCE_BACKENDS)
+            model_backends[model_id] = st.selectbox(
+                f"Backend untuk {model_registry.get_label(model_id)}:",
+                options=backend_options,
+                index=backend_options.index(model_registry.get_backend(model_id)),
+                format_func=INFERENCE_BACKENDS.get,
+                key=f"backend_{model_id}",
+            )
+        measure_drift = st.checkbox(
+            "🔬 Ukur latensi dan pergeseran CER setiap backend terhadap baseline",
+            value=False,
+            help="Setelah perbandingan, setiap model ditranskripsi ulang (tanpa cache) dengan backend yang dipilih di bawah, lalu latensi dan CER-nya dibandingkan dengan backend bawaan (PyTorch; float32 di CPU, float16 di GPU)."
+        )
+        drift_backends = []
+        if measure_drift:
+            drift_backends = st.multiselect("Backend yang diukur:", options=list(INFERENCE_BACKENDS), default=[DEFAULT_BACKEND, "int8"], format_func=INFERENCE_BACKENDS.get)
+        assisted_model_ids = [model_id for model_id in selected_model_ids if model_registry.get_spec(model_id)["draft_model"]]
+        measure_assisted = st.checkbox(
+            "🚀 Ukur decoding berbantuan (model draf) terhadap decoding biasa",
+            value=False,
+            disabled=not assisted_model_ids,
+            help="Model kecil (`draft_model` di models.json) mengusulkan beberapa token sekaligus dan model besar hanya memverifikasinya, sehingga langkah decoder model besar berkurang tanpa mengubah hasil (greedy decoding). Setelah perbandingan, model yang memiliki draf ditranskripsi ulang (tanpa cache) dengan kedua cara. Draf harus memakai tokenizer dan fitur log-mel yang sama; jika tidak, dilaporkan sebagai fallback ke decoding biasa."
+        )
+
+    loaded_models = model_registry.loaded_models()
+    if loaded_models:
+        st.caption("Model di memori: " + ", ".join(f"{model_registry.get_label(model_id, backend)} ({size_mb:.0f} MB)" for model_id, backend, size_mb in loaded_models))
+    busy_lanes = [(model_id, backend, num_pending) for model_id, backend, num_pending, _ in inference_scheduler.stats() if num_pending > 0]
+    if busy_lanes:
+        st.caption("🚦 Antrean saat ini: " + ", ".join(f"{model_registry.get_label(model_id, backend)} ({num_pending} menunggu)" for model_id, backend, num_pending in busy_lanes))
+
+    run_concurrently = st.checkbox(
+        "⚡ Jalankan semua model secara bersamaan",
+        value=True,
+        help="Model-model mentranskripsi audio secara paralel dengan pembagian inti CPU, sehingga total waktu tunggu mendekati waktu model yang paling lambat. Waktu masing-masing model tetap diukur terpisah."
+    )
+
+    long_form_mode = st.checkbox(
+        "📼 Mode audio panjang (streaming per potongan)",
+        value=False,
+        help="Audio didekode dan ditranskripsi per potongan yang saling tumpang tindih. Memori tetap kecil untuk file berdurasi panjang dan teks pertama muncul dalam hitungan detik. Whisper hanya memproses 30 detik per panggilan, jadi gunakan mode ini untuk audio yang lebih panjang."
+    )
+    if long_form_mode:
+        chunk_length_s = st.slider("Panjang potongan (detik)", min_value=10, max_value=30, value=30)
+        stride_length_s = st.slider("Tumpang tindih antar potongan (detik)", min_value=0, max_value=8, value=4)
+
+    use_transcription_cache = st.checkbox(
+        "🗄️ Gunakan cache hasil transkripsi",
+        value=True,
+        help="Hasil transkripsi disimpan di disk berdasarkan hash audio dan konfigurasi model. Audio yang sama akan langsung diambil dari cache tanpa inferensi ulang, juga di sesi lain dan setelah server dimulai ulang."
+    )
+
+    use_vad = st.checkbox(
+        "✂️ Buang bagian senyap (VAD) dan transkripsi per segmen ucapan",
+        value=False,
+        help="Bagian senyap dan jeda panjang dideteksi dari energi pita frekuensi ucapan (CPU, tanpa model tambahan) lalu dibuang. Segmen ucapan ditranskripsi per batch oleh setiap model, dan waktunya dipetakan kembali ke audio asli. Mengurangi waktu inferensi sebanding dengan porsi senyap dan mencegah halusinasi Whisper pada bagian tanpa ucapan. Tidak berlaku untuk mode audio panjang dan mode profil per tahap."
+    )
+
+    profile_stages = st.checkbox(
+        "🩺 Profil per tahap (dekode, ekstraksi fitur, encoder, decoder)",
+        value=False,
+        help="Mengukur waktu dan puncak memori (RSS proses) setiap tahap inferensi. Saat aktif, cache tidak dipakai agar inferensi benar-benar dijalankan. Tidak berlaku untuk mode audio panjang. Saat model berjalan bersamaan, angka memori mencakup seluruh proses."
+    )
+    export_trace = False
+    if profile_stages:
+        export_trace = st.checkbox("Simpan trace torch profiler (format Chrome, dapat dibuka di Perfetto)", value=False)
+
+    compare_romaji = st.checkbox(
+        "🔤 Hitung CER pada tingkat Romaji",
+        value=False,
+        disabled=not romaji_transliterator.initialized,
+        help="Transkripsi diubah ke Romaji (tanpa spasi dan tanda baca) sebelum CER dihitung, sehingga perbedaan penulisan yang dibaca sama (mis. Kanji vs Kana) tidak dihitung sebagai kesalahan. Sorotan perbedaan tetap pada teks Kanji/Kana."
+    )
+
+    summary_container = None
     if st.button("▶️ Mulai Perbandingan!"):
-        if audio_path:
-            # Panggil fungsi pemrosesan untuk kedua model dan simpan hasilnya
-            st.session_state.base_transcript, st.session_state.base_duration = \
-                process_audio_with_model(audio_path, asr_pipeline_base, "OpenAI Whisper (Base)", kakasi_converter, PYKAKASI_INITIALIZED)
-            st.session_state.anime_transcript, st.session_state.anime_duration = \
-                process_audio_with_model(audio_path, anime_whisper_pipeline, "litagin/anime-whisper", kakasi_converter, PYKAKASI_INITIALIZED)
-
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-            
-            # --- TAMPILKAN KESIMPULAN OTOMATIS ---
-            # Pastikan kedua transkripsi tidak error sebelum melanjutkan ke perbandingan
-            if st.session_state.base_transcript and st.session_state.base_transcript != "Error saat transkripsi." and \
-               st.session_state.anime_transcript and st.session_state.anime_transcript != "Error saat transkripsi.":
-
-                st.markdown("### Perbandingan Langsung Transkripsi (Kanji/Kana)")
-                diff_output_html = highlight_diff(st.session_state.base_transcript, st.session_state.anime_transcript, "Whisper Base", "Anime-Whisper")
-                st.markdown(diff_output_html, unsafe_allow_html=True)
-
-                st.markdown("---")
-                st.header("3. Kesimpulan Perbandingan Otomatis")
-
-                # Perbandingan Waktu Transkripsi
-                st.subheader("📊 Perbandingan Waktu Transkripsi:")
-                time_diff = abs(st.session_state.base_duration - st.session_state.anime_duration)
-                
-                faster_model = "OpenAI Whisper (Base)" if st.session_state.base_duration < st.session_state.anime_duration else "litagin/anime-whisper"
-                slower_model = "litagin/anime-whisper" if st.session_state.base_duration < st.session_state.anime_duration else "OpenAI Whisper (Base)"
-                
-                speed_diff_percent = 0
-                if max(st.session_state.base_duration, st.session_state.anime_duration) > 0:
-                    speed_diff_percent = (time_diff / max(st.session_state.base_duration, st.session_state.anime_duration)) * 100
-
-                st.info(f"**{faster_model}** menyelesaikan transkripsi dalam **{min(st.session_state.base_duration, st.session_state.anime_duration):.2f} detik**, sedangkan **{slower_model}** membutuhkan **{max(st.session_state.base_duration, st.session_state.anime_duration):.2f} detik**. Ini berarti {faster_model} lebih cepat sekitar **{speed_diff_percent:.2f}%** pada audio ini.")
-
-                # Perbandingan Akurasi (Character Error Rate - CER)
-                st.subheader("⚖️ Perbandingan Kesamaan Teks (antara kedua model):")
-                ref_text_cleaned = st.session_state.base_transcript.strip()
-                hyp_text_cleaned = st.session_state.anime_transcript.strip()
-
-                if ref_text_cleaned or hyp_text_cleaned:
-                    try:
-                        character_error_rate = cer([ref_text_cleaned], [hyp_text_cleaned]) * 100
-                        st.metric("Character Error Rate (CER)", f"{character_error_rate:.2f}%", help="Persentase karakter yang berbeda antara dua transkripsi. Dihitung sebagai (Substitusi + Penghapusan + Penambahan) / Total Karakter Referensi. Semakin rendah, semakin mirip.")
-
-                        matcher = difflib.SequenceMatcher(None, ref_text_cleaned, hyp_text_cleaned)
-                        replacements = 0
-                        deletions = 0
-                        insertions = 0
-                        
-                        for opcode, a_start, a_end, b_start, b_end in matcher.get_opcodes():
-                            if opcode == 'replace':
-                                replacements += 1
-                            elif opcode == 'delete':
-                                deletions += 1
-                            elif opcode == 'insert':
-                                insertions += 1
-                        
-                        st.info(f"Ditemukan **{replacements}** penggantian, **{deletions}** penghapusan, dan **{insertions}** penambahan karakter antara kedua transkripsi.")
-
-                        st.markdown("#### 📝 Ringkasan Umum:")
-                        summary_text = ""
-                        if character_error_rate < 5:
-                            summary_text += "Kedua model menghasilkan transkripsi yang sangat mirip dengan tingkat kesalahan karakter yang rendah. Ini menunjukkan konsistensi tinggi."
-                        elif character_error_rate < 20:
-                            summary_text += "Kedua model menunjukkan kemiripan yang cukup, namun ada beberapa perbedaan karakter. Mungkin salah satu model lebih baik untuk nuansa tertentu atau istilah spesifik."
-                        else:
-                            summary_text += "Ada perbedaan signifikan antara transkripsi kedua model. Ini mungkin mengindikasikan bahwa model 'litagin/anime-whisper' memiliki bias yang berbeda atau dilatih pada dataset yang sangat spesifik (anime), yang mungkin tidak cocok untuk semua jenis audio Jepang, atau sebaliknya."
-                        
-                        summary_text += f"\n\nDalam hal kecepatan, **{faster_model}** secara signifikan lebih cepat daripada **{slower_model}** untuk audio ini."
-
-                        st.markdown(summary_text)
-
-                    except ValueError as ve:
-                        st.warning(f"Tidak dapat menghitung CER atau analisis perbedaan: {ve}. Ini mungkin terjadi jika transkripsi menghasilkan teks yang sangat tidak biasa atau kosong.")
-                        st.info("Pastikan output transkripsi adalah teks yang valid. Anda dapat memeriksa detail log untuk informasi lebih lanjut.")
-                else:
-                    st.warning("Tidak dapat menghitung Character Error Rate (CER) atau ringkasan karena kedua transkripsi (setelah pembersihan) kosong.")
+        st.session_state.comparison_results = []
+        audio_input = None
+        if audio_bytes and len(selected_model_ids) >= 2 and not long_form_mode:
+            # Dekode sekali saja; buffer yang sama dipakai oleh semua model
+            decode_profiler = StageProfiler()
+            try:
+                with st.spinner("⏳ Mendekode audio..."):
+                    if profile_stages:
+                        with decode_profiler.stage("decode"):
+                            audio_input = {"raw": decode_audio_bytes(audio_bytes), "sampling_rate": TARGET_SAMPLING_RATE}
+                    else:
+                        audio_input = {"raw": decode_audio_bytes(audio_bytes), "sampling_rate": TARGET_SAMPLING_RATE}
+            except Exception as e:
+                st.error(f"❌ Error mendekode file audio: {e}")
+                st.info("Pastikan format file audio kompatibel dan tidak korup. Coba unggah file lain.")
+
+        speech = None
+        if audio_input is not None and use_vad and not profile_stages:
+            # Segmen ucapan dideteksi sekali dan dipakai bersama oleh semua model
+            speech = segment_speech(audio_input)
+            st.caption(
+                f"✂️ VAD: {len(speech['segments'])} segmen ucapan, {speech['speech_duration']:.1f} dari {speech['total_duration']:.1f} detik audio "
+                f"({speech['speech_ratio'] * 100:.0f}% ucapan); {speech['total_duration'] - speech['speech_duration']:.1f} detik senyap dilewati."
+            )
+            if not speech["segments"]:
+                st.warning("Tidak ada ucapan yang terdeteksi pada audio ini.")
+
+        if audio_bytes and len(selected_model_ids) < 2:
+            st.warning("Pilih minimal dua model untuk dibandingkan.")
+        elif audio_bytes and (long_form_mode or audio_input is not None):
+            transcription_cache = get_transcription_cache() if use_transcription_cache else None
+            comparison_results = []
+            if long_form_mode:
+                # Hasil streaming per potongan tidak disimpan di cache transkripsi
+                try:
+                    with st.spinner("⏳ Memuat model yang dipilih..."):
+                        for model_id in selected_model_ids:
+                            model_registry.get_pipeline(model_id, model_backends[model_id])
+                    labeled_models = [(model_registry.get_label(model_id, model_backends[model_id]), model_id, model_backends[model_id]) for model_id in selected_model_ids]
+                    long_form_results = run_long_form_comparison(
+                        lambda: io.BytesIO(audio_bytes), labeled_models, model_registry, chunk_length_s, stride_length_s, run_concurrently, inference_scheduler,
+                    )
+                    for model_label, (transcription_japanese, duration_asr) in long_form_results.items():
+                        comparison_results.append({"label": model_label, "text": transcription_japanese, "duration": duration_asr})
+                except Exception as e:
+                    st.error(f"❌ Terjadi kesalahan saat transkripsi audio panjang: {e}")
+                    st.exception(e)
+            elif run_concurrently:
+                start_time_total = time.perf_counter()
+                with st.spinner("⏳ Sedang mentranskripsi audio dengan semua model secara bersamaan (model dimuat terlebih dahulu bila belum ada di memori)..."):
+                    queue_placeholder = st.empty()
+                    concurrent_results = transcribe_models_concurrently(
+                        audio_input, selected_model_ids, model_registry, transcription_cache, model_backends,
+                        profile_stages, export_trace, inference_scheduler,
+                        speech=speech, on_queue_positions=lambda waiting: queue_placeholder.caption("🚦 Menunggu antrean: " + ", ".join(f"{model_registry.get_label(model_id)} (posisi {position})" for model_id, position in waiting.items())) if waiting else None,
+                    )
+                    queue_placeholder.empty()
+                duration_total = time.perf_counter() - start_time_total
+                st.caption(f"Total waktu tunggu (paralel): **{duration_total:.2f} detik**")
+
+                for model_id, (inference_result, error) in concurrent_results.items():
+                    model_label = model_registry.get_label(model_id, model_backends[model_id])
+                    display_transcription_result(model_label, inference_result, romaji_transliterator, error)
+                    comparison_results.append(comparison_entry(model_label, inference_result))
+            else:
+                # Panggil fungsi pemrosesan untuk setiap model dan simpan hasilnya
+                for model_id in selected_model_ids:
+                    model_label = model_registry.get_label(model_id, model_backends[model_id])
+                    inference_result = process_audio_with_model(
+                        audio_input, model_id, model_registry, model_label, romaji_transliterator,
+                        transcription_cache, model_backends[model_id], profile_stages, export_trace,
+                        inference_scheduler, speech,
+                    )
+                    comparison_results.append(comparison_entry(model_label, inference_result))
+
+            if profile_stages and not long_form_mode:
+                # Tahap dekode dijalankan sekali untuk semua model, jadi dicatat di setiap hasil
+                for result in comparison_results:
+                    if result.get("stages"):
+                        result["stages"] = {**decode_profiler.stages, **result["stages"]}
 
+            # --- TAMPILKAN KESIMPULAN OTOMATIS ---
+            # Pastikan semua transkripsi tidak error sebelum melanjutkan ke perbandingan
+            if len(comparison_results) >= 2 and all(result["text"] and result["text"] != "Error saat transkripsi." for result in comparison_results):
+                # Kesimpulan dirender di bawah (di luar cabang tombol) dari session_state, di posisi ini
+                st.session_state.comparison_results = comparison_results
+                summary_container = st.container()
             else:
-                st.error("❌ Gagal membuat kesimpulan perbandingan otomatis karena salah satu atau kedua model gagal dalam transkripsi.")
-        else:
+                st.error("❌ Gagal membuat kesimpulan perbandingan otomatis karena satu atau lebih model gagal dalam transkripsi.")
+
+            if measure_drift and drift_backends and not long_form_mode:
+                st.subheader("🔬 Latensi dan Pergeseran CER per Backend")
+                st.caption("Baseline = backend bawaan PyTorch dengan dtype yang tercantum (float32 di CPU, float16 di GPU). Percepatan = latensi baseline / latensi backend. Pergeseran CER = CER transkripsi backend terhadap transkripsi baseline (0% berarti identik).")
+                for model_id in selected_model_ids:
+                    with st.spinner(f"⏳ Mengukur backend untuk {model_registry.get_label(model_id)}..."):
+                        drift_rows = measure_backend_drift(audio_input, model_id, model_registry, drift_backends, inference_scheduler)
+                    st.markdown(f"**{model_registry.get_label(model_id)}**")
+                    st.dataframe(drift_rows, use_container_width=True)
+
+            if measure_assisted and assisted_model_ids and not long_form_mode:
+                st.subheader("🚀 Decoding Biasa vs Decoding Berbantuan")
+                st.caption("Percepatan = waktu decoding biasa / waktu decoding berbantuan. Kolom 'Hasil identik' memastikan model draf tidak mengubah transkripsi.")
+                assisted_rows = []
+                for model_id in assisted_model_ids:
+                    with st.spinner(f"⏳ Mengukur decoding berbantuan untuk {model_registry.get_label(model_id)}..."):
+                        try:
+                            assisted_result = measure_assisted_decoding(audio_input, model_id, model_registry, model_backends[model_id], scheduler=inference_scheduler)
+                        except QueueFullError as e:
+                            st.warning(f"🚦 Server sedang sibuk, decoding berbantuan untuk {model_registry.get_label(model_id)} dilewati: {e}")
+                            continue
+                        except Exception as e:
+                            st.error(f"❌ Gagal mengukur decoding berbantuan untuk {model_registry.get_label(model_id)}: {e}")
+                            continue
+                    assisted_rows.append({
+                        "Model": model_registry.get_label(model_id, model_backends[model_id]),
+                        "Model draf": model_registry.get_label(assisted_result["draft_model"]),
+                        "Biasa (detik)": round(assisted_result["plain_duration"], 2),
+                        "Berbantuan (detik)": round(assisted_result["assisted_duration"], 2) if assisted_result["assisted_duration"] is not None else None,
+                        "Percepatan": round(assisted_result["speedup"], 2) if assisted_result["speedup"] is not None else None,
+                        "Hasil identik": assisted_result["identical"],
+                        "Catatan": f"Fallback ke decoding biasa: {assisted_result['fallback_reason']}" if assisted_result["fallback_reason"] else "",
+                    })
+                if assisted_rows:
+                    st.dataframe(assisted_rows, use_container_width=True)
+        elif not audio_bytes:
             st.warning("Silakan unggah file audio Anda terlebih dahulu di bagian '1. Unggah File Audio' untuk memulai perbandingan.")
 
+    # Kesimpulan tetap tampil pada rerun tanpa menekan tombol (mis. saat halaman tabel perbedaan diganti)
+    if st.session_state.comparison_results:
+        with summary_container or st.container():
+            render_comparison_summary(st.session_state.comparison_results, romaji_transliterator if compare_romaji else None)
+
+with tab_corpus: # Evaluasi batch terhadap transkripsi referensi
+    st.header("Evaluasi Korpus dengan Ground Truth")
+    st.markdown("Evaluasi banyak file audio sekaligus terhadap transkripsi referensi. Masukkan path direktori (file audio + file `.txt` bernama sama) atau manifest `.jsonl`/`.csv`/`.tsv` dengan kolom `audio` dan `text` di server.")
+
+    dataset_path = st.text_input("Path direktori atau manifest dataset:")
+    corpus_model_ids = st.multiselect(
+        "Model yang dievaluasi:",
+        options=list(model_registry.specs),
+        default=model_registry.default_model_ids(),
+        format_func=model_registry.get_label,
+        key="corpus_model_ids",
+    )
+    batch_size = st.slider("Ukuran batch inferensi", min_value=1, max_value=32, value=8, help="Audio diurutkan berdasarkan durasi lalu dikelompokkan per batch agar padding minimal.")
+    corpus_compare_romaji = st.checkbox(
+        "🔤 Hitung juga CER pada tingkat Romaji",
+        value=False,
+        disabled=not romaji_transliterator.initialized,
+        key="corpus_compare_romaji",
+        help="Referensi dan hipotesis ditransliterasi ke Romaji secara paralel (kalimat yang berulang hanya diproses sekali), sehingga perbedaan penulisan Kanji/Kana dengan bacaan yang sama tidak dihitung sebagai kesalahan."
+    )
+
+    if st.button("▶️ Mulai Evaluasi Korpus"):
+        if not dataset_path or not os.path.exists(dataset_path):
+            st.warning("Path dataset tidak ditemukan. Periksa kembali path yang dimasukkan.")
+        else:
+            try:
+                evaluation_items = load_evaluation_dataset(dataset_path)
+            except Exception as e:
+                st.error(f"❌ Gagal memuat dataset: {e}")
+                evaluation_items = []
+
+            if evaluation_items:
+                st.info(f"Ditemukan **{len(evaluation_items)}** pasangan audio + referensi.")
+                corpus_summary = []
+                for model_id in corpus_model_ids:
+                    model_label = model_registry.get_label(model_id)
+                    progress_bar = st.progress(0.0, text=f"⏳ Mengevaluasi {model_label}...")
+                    # Evaluasi berjalan di pekerja penjadwal; progres dicatat di sana dan ditampilkan dari thread skrip
+                    corpus_progress = {"done": 0, "total": 0}
+
+                    def evaluate_corpus(model_id=model_id):
+                        return evaluate_pipeline(
+                            model_registry.get_pipeline(model_id), evaluation_items, batch_size,
+                            progress_callback=lambda done, total: corpus_progress.update(done=done, total=total),
+                            generate_kwargs=model_registry.get_generate_kwargs(model_id),
+                            romaji_transliterator=romaji_transliterator if corpus_compare_romaji else None,
+                        )
+
+                    def show_corpus_progress(position, model_label=model_label):
+                        if position > 0:
+                            progress_bar.progress(0.0, text=f"🚦 {model_label}: menunggu antrean (posisi {position})...")
+                        elif corpus_progress["total"]:
+                            done, total = corpus_progress["done"], corpus_progress["total"]
+                            progress_bar.progress(done / total, text=f"⏳ Mengevaluasi {model_label}... batch {done}/{total}")
+
+                    try:
+                        evaluation = inference_scheduler.run_exclusive(model_id, evaluate_corpus, on_queue_position=show_corpus_progress)
+                    except Exception as e:
+                        st.error(f"❌ Terjadi kesalahan saat evaluasi dengan {model_label}: {e}")
+                        st.exception(e)
+                        continue
+                    progress_bar.progress(1.0, text=f"✅ Evaluasi {model_label} Selesai!")
+
+                    corpus_summary.append({
+                        "Model": model_label,
+                        "CER (%)": round(evaluation["cer"] * 100, 2),
+                        **({"CER Romaji (%)": round(evaluation["romaji_cer"] * 100, 2)} if "romaji_cer" in evaluation else {}),
+                        "WER (%)": round(evaluation["wer"] * 100, 2),
+                        "Jumlah File": evaluation["num_files"],
+                        "Durasi Audio (dtk)": round(evaluation["audio_duration"], 1),
+                        "Waktu Proses (dtk)": round(evaluation["processing_time"], 1),
+                        "Real-Time Factor": round(evaluation["rtf"], 3),
+                    })
+                    with st.expander(f"Rincian per file: {model_label}"):
+                        st.dataframe([
+                            {
+                                "Audio": os.path.basename(file_result["audio"]),
+                                "CER (%)": round(file_result["cer"] * 100, 2),
+                                **({"CER Romaji (%)": round(file_result["romaji_cer"] * 100, 2)} if "romaji_cer" in file_result else {}),
+                                "Referensi": file_result["reference"],
+                                "Hipotesis": file_result["hypothesis"],
+                            }
+                            for file_result in evaluation["files"]
+                        ], use_container_width=True)
+
+                if corpus_summary:
+                    st.subheader("📊 Ringkasan Korpus")
+                    st.dataframe(corpus_summary, use_container_width=True)
+                    st.caption("Real-Time Factor (RTF) = waktu proses / durasi audio. Nilai di bawah 1 berarti lebih cepat dari waktu nyata. WER dihitung per token yang dipisahkan spasi, sehingga untuk teks Jepang CER lebih bermakna.")
+            else:
+                st.warning("Tidak ada pasangan audio + referensi yang valid di dataset tersebut.")
+
 with tab2: # Konten tentang proyek
     st.header("Tentang Proyek Ini")
     st.markdown("""
@@ -366,6 +905,7 @@ with tab2: # Konten tentang proyek
 
     ### Fitur Utama:
     - **Pengunggahan Audio:** Pengguna dapat mengunggah file audio mereka sendiri (.wav, .mp3, .flac).
+    - **Registry Model:** Daftar model, dtype, perangkat, dan pengaturan generasi diatur di `models.json`. Model dimuat saat pertama kali dipakai dan dikeluarkan dari memori (LRU) bila anggaran memori terlampaui, sehingga lebih dari dua model dapat dibandingkan sekaligus.
     - **Transkripsi Bilingual:** Menampilkan transkripsi dalam aksara Jepang (Kanji/Kana) dan transliterasi ke Romaji.
     - **Perbandingan Visual:** Menggunakan penyorotan perbedaan karakter-demi-karakter untuk memvisualisasikan ketidaksesuaian antara hasil transkripsi kedua model.
     - **Kesimpulan Otomatis:** Menyediakan ringkasan kuantitatif mengenai:
@@ -379,7 +919,7 @@ with tab2: # Konten tentang proyek
     - **Hugging Face Transformers:** Pustaka terkemuka untuk model AI, termasuk Whisper.
     - **PyKakasi:** Pustaka Python untuk transliterasi Jepang ke Romaji.
     - **Jiwer:** Pustaka untuk menghitung metrik Word Error Rate (WER) dan Character Error Rate (CER).
-    - **Difflib:** Pustaka standar Python untuk membandingkan urutan (digunakan untuk visualisasi perbedaan teks).
+    - **RapidFuzz:** Jarak Levenshtein terkompilasi untuk penyejajaran teks (penyorotan perbedaan, jumlah S/D/I, dan CER dari satu penyejajaran), dengan difflib sebagai cadangan.
 
     ### Catatan Penting:
     - Kinerja (terutama kecepatan) sangat bergantung pada sumber daya komputasi yang tersedia (GPU direkomendasikan).
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import soundfile as sf
+
+# Versi format kunci cache. Naikkan jika cara menghitung kunci berubah
+# agar entri lama tidak terbaca sebagai hasil yang valid.
+CACHE_KEY_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get("ASR_CACHE_DIR", ".asr_cache")
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("ASR_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+def compute_audio_hash(audio_input):
+    """
+    Menghitung hash SHA-256 dari audio yang sudah didekode (sampel float32 + sampling rate),
+    sehingga file yang sama dengan metadata/kontainer berbeda tetap menghasilkan kunci yang sama.
+    Menerima path file, array NumPy, atau dict {"raw": ..., "sampling_rate": ...}.
+    """
+    hasher = hashlib.sha256()
+
+    if isinstance(audio_input, dict):
+        samples = np.ascontiguousarray(audio_input["raw"], dtype=np.float32)
+        sampling_rate = int(audio_input["sampling_rate"])
+    elif isinstance(audio_input, np.ndarray):
+        samples = np.ascontiguousarray(audio_input, dtype=np.float32)
+        sampling_rate = 0
+    else:
+        try:
+            samples, sampling_rate = sf.read(audio_input, dtype="float32", always_2d=False)
+            samples = np.ascontiguousarray(samples)
+        except Exception:
+            # Format yang tidak bisa dibaca soundfile (mis. MP3 pada libsndfile lama):
+            # gunakan byte mentah file sebagai gantinya.
+            with open(audio_input, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+            return "file:" + hasher.hexdigest()
+
+    hasher.update(str(sampling_rate).encode("utf-8"))
+    hasher.update(samples.tobytes())
+    return "pcm:" + hasher.hexdigest()
+
+
+def model_fingerprint(model_name, dtype, generate_kwargs=None, backend="pytorch"):
+    """
+    Membuat sidik jari konfigurasi model (nama model, dtype, backend inferensi, dan pengaturan generasi)
+    untuk digabungkan dengan hash audio sebagai kunci cache.
+    """
+    fingerprint = {
+        "model": model_name,
+        "dtype": str(dtype),
+        "backend": backend,
+        "generate_kwargs": generate_kwargs or {},
+    }
+    return json.dumps(fingerprint, sort_keys=True, default=str)
+
+
+class TranscriptionCache:
+    """
+    Cache hasil transkripsi persisten di disk (SQLite) yang dialamatkan berdasarkan isi audio.
+    Ukuran total dibatasi; entri yang paling lama tidak diakses dihapus lebih dulu (LRU).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "transcriptions.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON transcriptions (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # Koneksi baru per operasi agar aman dipakai dari beberapa thread/sesi Streamlit
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(audio_hash, fingerprint):
+        raw_key = f"v{CACHE_KEY_VERSION}|{audio_hash}|{fingerprint}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Mengembalikan dict {"text", "duration"} jika ada di cache, atau None."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT text, duration FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE transcriptions SET last_access = ? WHERE key = ?", (time.time(), key))
+        return {"text": row[0], "duration": row[1]}
+
+    def put(self, key, model_name, text, duration):
+        """Menyimpan hasil transkripsi lalu mengosongkan entri lama jika melebihi batas ukuran."""
+        size = len(text.encode("utf-8")) + len(key) + len(model_name)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, model, text, duration, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, text, duration, size, time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM transcriptions ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM transcriptions WHERE key = ?", (key,))
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM transcriptions")
@@ -0,0 +1,344 @@
+import gc
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+from transformers import AutoConfig, pipeline
+
+from asr_cache import model_fingerprint
+
+# Variabel global untuk nama model
+MODEL_WHISPER_BASE = "openai/whisper-base"
+MODEL_ANIME_WHISPER = "litagin/anime-whisper"
+
+# File konfigurasi registry model (bisa diganti lewat variabel lingkungan)
+DEFAULT_MODELS_CONFIG_PATH = os.environ.get("ASR_MODELS_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.json"))
+DEFAULT_MEMORY_BUDGET_MB = 8192
+
+# Backend inferensi yang bisa dipilih per model
+INFERENCE_BACKENDS = {
+    "pytorch": "PyTorch (dtype bawaan)",
+    "int8": "PyTorch int8 (kuantisasi dinamis)",
+    "bfloat16": "PyTorch bfloat16",
+    "onnx": "ONNX Runtime",
+}
+DEFAULT_BACKEND = "pytorch"
+ONNX_EXPORT_DIR = os.environ.get("ASR_ONNX_EXPORT_DIR", ".onnx_models")
+
+TORCH_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+def get_inference_device():
+    """Menentukan perangkat GPU/CPU beserta torch_dtype yang sesuai (float16 di GPU)."""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    device_id = 0 if device == "cuda" else -1
+    torch_dtype = torch.float16 if device == "cuda" else torch.float32
+    return device_id, torch_dtype
+
+
+def resolve_device_and_dtype(device="auto", dtype="auto"):
+    """Menerjemahkan nilai `device`/`dtype` dari konfigurasi ("auto", "cpu", "cuda", "float16", ...)."""
+    default_device_id, default_torch_dtype = get_inference_device()
+    if device == "auto":
+        device_id = default_device_id
+    elif device == "cpu":
+        device_id = -1
+    else:
+        device_id = 0 if device == "cuda" else int(str(device).split(":")[-1])
+    torch_dtype = default_torch_dtype if dtype == "auto" else TORCH_DTYPES[dtype]
+    return device_id, torch_dtype
+
+
+def load_asr_pipeline(model_name, device="auto", dtype="auto", backend=DEFAULT_BACKEND):
+    """
+    Memuat satu pipeline ASR Hugging Face tanpa ketergantungan pada Streamlit,
+    sehingga bisa dipakai oleh aplikasi maupun skrip baris perintah.
+    `backend` menentukan cara inferensi (lihat INFERENCE_BACKENDS); backend int8 dan
+    ONNX Runtime selalu berjalan di CPU dengan bobot float32 sebagai titik awal.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Backend inferensi tidak dikenal: '{backend}'. Pilihan: {', '.join(INFERENCE_BACKENDS)}.")
+    if backend == "onnx":
+        return _load_onnx_pipeline(model_name)
+    if backend == "int8":
+        device, dtype = "cpu", "float32"
+    elif backend == "bfloat16":
+        dtype = "bfloat16"
+
+    device_id, torch_dtype = resolve_device_and_dtype(device, dtype)
+    asr_pipeline = pipeline(
+        "automatic-speech-recognition",
+        model=model_name,
+        device=device_id,
+        torch_dtype=torch_dtype,
+        model_kwargs={"low_cpu_mem_usage": True, "use_safetensors": True}
+    )
+
+    if backend == "int8":
+        # Kuantisasi dinamis: bobot nn.Linear disimpan sebagai int8, aktivasi dikuantisasi saat runtime
+        asr_pipeline.model = torch.ao.quantization.quantize_dynamic(asr_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return asr_pipeline
+
+
+def _load_onnx_pipeline(model_name):
+    """
+    Memuat model sebagai sesi ONNX Runtime encoder/decoder melalui `optimum`. Model diekspor
+    ke ONNX sekali lalu disimpan di ONNX_EXPORT_DIR agar pemuatan berikutnya tidak mengekspor ulang.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        from transformers import AutoProcessor
+    except ImportError as e:
+        raise RuntimeError("Backend ONNX Runtime membutuhkan paket `optimum[onnxruntime]`. Instal dengan `pip install optimum[onnxruntime]`.") from e
+
+    export_path = os.path.join(ONNX_EXPORT_DIR, model_name.replace("/", "--"))
+    if os.path.isdir(export_path):
+        ort_model = ORTModelForSpeechSeq2Seq.from_pretrained(export_path)
+        processor = AutoProcessor.from_pretrained(export_path)
+    else:
+        ort_model = ORTModelForSpeechSeq2Seq.from_pretrained(model_name, export=True)
+        processor = AutoProcessor.from_pretrained(model_name)
+        ort_model.save_pretrained(export_path)
+        processor.save_pretrained(export_path)
+
+    return pipeline(
+        "automatic-speech-recognition",
+        model=ort_model,
+        tokenizer=processor.tokenizer,
+        feature_extractor=processor.feature_extractor,
+    )
+
+
+def estimate_pipeline_memory(asr_pipeline):
+    """Perkiraan memori (byte) yang dipakai bobot dan buffer model di dalam pipeline."""
+    model = asr_pipeline.model
+    if not isinstance(model, torch.nn.Module):
+        # Model ONNX Runtime: gunakan ukuran file .onnx sebagai perkiraan
+        model_dir = getattr(model, "model_save_dir", None)
+        if model_dir is None or not os.path.isdir(model_dir):
+            return 0
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(model_dir) for name in names if name.endswith((".onnx", ".onnx_data")))
+
+    # state_dict juga mencakup bobot terkuantisasi yang tidak terdaftar sebagai parameter;
+    # bobot yang dibagi (tied, mis. embedding dan proj_out) hanya dihitung sekali
+    total_bytes = 0
+    seen_storages = set()
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, tuple) else (value,)
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor) and tensor.data_ptr() not in seen_storages:
+                seen_storages.add(tensor.data_ptr())
+                total_bytes += tensor.numel() * tensor.element_size()
+    return total_bytes
+
+
+def check_draft_config(target_config, draft_config):
+    """
+    Pemeriksaan awal dari konfigurasi saja (tanpa memuat bobot draf): model draf menjalankan encodernya
+    sendiri pada fitur log-mel milik model target dan mengusulkan token dari kosakata yang sama,
+    jadi jumlah bin log-mel dan ukuran kosakata harus sama.
+    Mengembalikan None jika cocok, atau alasan ketidakcocokan (str).
+    """
+    target_mel_bins = getattr(target_config, "num_mel_bins", None)
+    draft_mel_bins = getattr(draft_config, "num_mel_bins", None)
+    if target_mel_bins != draft_mel_bins:
+        return f"jumlah bin log-mel berbeda ({target_mel_bins} vs {draft_mel_bins})"
+    if target_config.vocab_size != draft_config.vocab_size:
+        return f"ukuran kosakata berbeda ({target_config.vocab_size} vs {draft_config.vocab_size})"
+    return None
+
+
+def check_draft_compatibility(target_pipeline, draft_pipeline):
+    """
+    Memeriksa apakah model draf bisa dipakai untuk decoding berbantuan (assisted/speculative)
+    model target: selain konfigurasi yang cocok (lihat `check_draft_config`), keduanya harus model
+    PyTorch di perangkat dan dtype yang sama dengan tokenizer yang identik.
+    Mengembalikan None jika kompatibel, atau alasan ketidakcocokan (str).
+    """
+    target_model, draft_model = target_pipeline.model, draft_pipeline.model
+    if not isinstance(target_model, torch.nn.Module) or not isinstance(draft_model, torch.nn.Module):
+        return "decoding berbantuan hanya didukung untuk model PyTorch (bukan ONNX Runtime)"
+    reason = check_draft_config(target_model.config, draft_model.config)
+    if reason is not None:
+        return reason
+    if (target_model.device, target_model.dtype) != (draft_model.device, draft_model.dtype):
+        return f"perangkat/dtype berbeda ({target_model.device}, {target_model.dtype} vs {draft_model.device}, {draft_model.dtype})"
+    if target_pipeline.tokenizer is None or draft_pipeline.tokenizer is None or target_pipeline.tokenizer.get_vocab() != draft_pipeline.tokenizer.get_vocab():
+        return "tokenizer tidak identik"
+    return None
+
+
+def load_models_config(config_path=DEFAULT_MODELS_CONFIG_PATH):
+    """Membaca file konfigurasi registry model (JSON)."""
+    with open(config_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ModelRegistry:
+    """
+    Registry model ASR yang dimuat saat pertama kali dipakai (lazy). Model yang sudah dimuat
+    disimpan dalam cache LRU; jika total memori melebihi anggaran, model yang paling lama
+    tidak dipakai dikeluarkan dari memori.
+    """
+
+    def __init__(self, config):
+        self.specs = OrderedDict()
+        for spec in config.get("models", []):
+            self.specs[spec["id"]] = {
+                "id": spec["id"],
+                "label": spec.get("label", spec["id"]),
+                "dtype": spec.get("dtype", "auto"),
+                "device": spec.get("device", "auto"),
+                "generate_kwargs": spec.get("generate_kwargs", {}),
+                "backend": spec.get("backend", DEFAULT_BACKEND),
+                "workers": spec.get("workers"),
+                "draft_model": spec.get("draft_model"),
+                "default": spec.get("default", False),
+            }
+        budget_mb = int(os.environ.get("ASR_MODEL_MEMORY_BUDGET_MB", config.get("memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)))
+        self.memory_budget_bytes = budget_mb * 1024 * 1024
+
+        self._loaded = OrderedDict()  # (model_id, backend) -> (pipeline, ukuran memori dalam byte)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._global_load_lock = threading.Lock()
+        self._draft_checks = {}  # (model_id, backend, draft_id) -> alasan tidak kompatibel atau None
+
+    @classmethod
+    def from_config(cls, config_path=DEFAULT_MODELS_CONFIG_PATH):
+        return cls(load_models_config(config_path))
+
+    def get_spec(self, model_id):
+        """Spesifikasi model; ID yang tidak terdaftar memakai pengaturan bawaan."""
+        if model_id not in self.specs:
+            return {"id": model_id, "label": model_id, "dtype": "auto", "device": "auto", "generate_kwargs": {}, "backend": DEFAULT_BACKEND, "workers": None, "draft_model": None, "default": False}
+        return self.specs[model_id]
+
+    def get_label(self, model_id, backend=None):
+        label = self.get_spec(model_id)["label"]
+        if backend is not None and backend != self.get_backend(model_id):
+            label += f" [{backend}]"
+        return label
+
+    def get_backend(self, model_id):
+        return self.get_spec(model_id)["backend"]
+
+    def get_generate_kwargs(self, model_id):
+        return dict(self.get_spec(model_id)["generate_kwargs"])
+
+    def get_assistant_model(self, model_id, backend=None):
+        """
+        Model draf untuk decoding berbantuan (`draft_model` di models.json). Mengembalikan
+        (model draf atau None, ID draf, alasan fallback atau None); jika tidak ada draf yang
+        kompatibel, pemanggil memakai decoding biasa.
+        """
+        draft_id = self.get_spec(model_id)["draft_model"]
+        if not draft_id:
+            return None, None, "tidak ada `draft_model` untuk model ini di models.json"
+        backend = backend or self.get_backend(model_id)
+        generate_kwargs = self.get_generate_kwargs(model_id)
+        if generate_kwargs.get("num_beams", 1) > 1 or generate_kwargs.get("do_sample"):
+            return None, draft_id, "decoding berbantuan hanya memberi hasil identik dengan greedy decoding (tanpa beam search/sampling)"
+        if backend == "onnx":
+            return None, draft_id, "decoding berbantuan hanya didukung untuk model PyTorch (bukan ONNX Runtime)"
+
+        target_pipeline = self.get_pipeline(model_id, backend)
+        check_key = (model_id, backend, draft_id)
+        if check_key not in self._draft_checks:
+            # Konfigurasi diperiksa dulu agar bobot draf yang jelas tidak cocok tidak perlu dimuat
+            reason = check_draft_config(target_pipeline.model.config, AutoConfig.from_pretrained(draft_id))
+            if reason is None:
+                reason = check_draft_compatibility(target_pipeline, self.get_draft_pipeline(draft_id, model_id, backend))
+            if reason is not None:
+                print(f"Peringatan: model draf '{draft_id}' tidak kompatibel dengan '{model_id}' ({reason}); memakai decoding biasa.")
+            self._draft_checks[check_key] = reason
+        reason = self._draft_checks[check_key]
+        if reason is not None:
+            return None, draft_id, reason
+        return self.get_draft_pipeline(draft_id, model_id, backend).model, draft_id, None
+
+    def default_model_ids(self):
+        return [model_id for model_id, spec in self.specs.items() if spec["default"]]
+
+    def get_dtype_name(self, model_id, backend=None):
+        """Nama dtype bobot yang benar-benar dipakai model untuk backend tertentu (mis. "float16" untuk pytorch di GPU)."""
+        spec = self.get_spec(model_id)
+        backend = backend or spec["backend"]
+        dtype = spec["dtype"]
+        if backend in ("int8", "onnx"):
+            dtype = "float32"
+        elif backend == "bfloat16":
+            dtype = "bfloat16"
+        _, torch_dtype = resolve_device_and_dtype(spec["device"], dtype)
+        return str(torch_dtype).replace("torch.", "")
+
+    def fingerprint(self, model_id, backend=None):
+        """Sidik jari konfigurasi model untuk kunci cache transkripsi, tanpa perlu memuat model."""
+        spec = self.get_spec(model_id)
+        backend = backend or spec["backend"]
+        return model_fingerprint(model_id, self.get_dtype_name(model_id, backend), spec["generate_kwargs"], backend)
+
+    def loaded_models(self):
+        """Daftar (model_id, backend, ukuran MB) model yang sedang berada di memori, dari yang paling baru dipakai."""
+        with self._lock:
+            return [(model_id, backend, size / (1024 * 1024)) for (model_id, backend), (_, size) in reversed(self._loaded.items())]
+
+    def get_pipeline(self, model_id, backend=None):
+        """Mengembalikan pipeline model untuk backend tertentu, memuatnya terlebih dahulu jika belum ada di memori."""
+        spec = self.get_spec(model_id)
+        backend = backend or spec["backend"]
+        return self._get_or_load((model_id, backend), lambda: load_asr_pipeline(model_id, spec["device"], spec["dtype"], backend))
+
+    def get_draft_pipeline(self, draft_id, model_id, backend=None):
+        """
+        Pipeline model draf untuk decoding berbantuan model `model_id`, dimuat dengan perangkat, dtype,
+        dan backend model target. Instance-nya terpisah dari pipeline biasa model yang sama karena
+        decoding berbantuan Whisper mengubah generation_config milik model draf.
+        """
+        spec = self.get_spec(model_id)
+        backend = backend or spec["backend"]
+        return self._get_or_load((draft_id, f"draft-{backend}"), lambda: load_asr_pipeline(draft_id, spec["device"], spec["dtype"], backend))
+
+    def _get_or_load(self, loaded_key, load_pipeline):
+        with self._lock:
+            if loaded_key in self._loaded:
+                self._loaded.move_to_end(loaded_key)
+                return self._loaded[loaded_key][0]
+            load_lock = self._load_locks.setdefault(loaded_key, threading.Lock())
+
+        # Kunci per model: model lain yang sudah dimuat tetap bisa diambil selama model ini dimuat,
+        # dan model yang sama tidak dimuat dua kali oleh thread berbeda.
+        with load_lock:
+            with self._lock:
+                if loaded_key in self._loaded:
+                    self._loaded.move_to_end(loaded_key)
+                    return self._loaded[loaded_key][0]
+
+            # Pemuatan bobot transformers memakai konteks global (perangkat meta, inisialisasi bobot
+            # dilewati) yang tidak aman dijalankan bersamaan di beberapa thread, jadi pemuatan antar
+            # model dijalankan satu per satu
+            with self._global_load_lock:
+                asr_pipeline = load_pipeline()
+
+            with self._lock:
+                self._loaded[loaded_key] = (asr_pipeline, estimate_pipeline_memory(asr_pipeline))
+                self._evict_over_budget()
+            return asr_pipeline
+
+    def _evict_over_budget(self):
+        # Model yang baru dimuat (paling akhir) tidak pernah dikeluarkan
+        evicted = False
+        while len(self._loaded) > 1 and sum(size for _, size in self._loaded.values()) > self.memory_budget_bytes:
+            (evicted_model_id, evicted_backend), _ = self._loaded.popitem(last=False)
+            print(f"Info: model '{evicted_model_id}' ({evicted_backend}) dikeluarkan dari memori (melebihi anggaran memori).")
+            evicted = True
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
@@ -0,0 +1,64 @@
+import io
+
+import numpy as np
+import soundfile as sf
+
+# Sampling rate yang diharapkan feature extractor Whisper
+TARGET_SAMPLING_RATE = 16000
+
+
+def decode_audio_bytes(audio_bytes, target_sampling_rate=TARGET_SAMPLING_RATE):
+    """
+    Mendekode isi file audio (bytes) langsung di memori menjadi array float32 mono
+    dengan sampling rate target. Menggunakan soundfile terlebih dahulu dan ffmpeg
+    sebagai cadangan untuk format yang tidak didukung libsndfile (mis. MP3 pada versi lama).
+    """
+    try:
+        samples, sampling_rate = sf.read(io.BytesIO(audio_bytes), dtype="float32", always_2d=True)
+    except Exception:
+        return _ffmpeg_decode(audio_bytes, target_sampling_rate)
+
+    samples = samples.mean(axis=1)
+    if sampling_rate != target_sampling_rate:
+        try:
+            import torch
+            import torchaudio.functional as F
+        except ImportError:
+            return _ffmpeg_decode(audio_bytes, target_sampling_rate)
+        samples = F.resample(torch.from_numpy(samples), sampling_rate, target_sampling_rate).numpy()
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def _ffmpeg_decode(audio_bytes, target_sampling_rate):
+    # ffmpeg sekaligus melakukan downmix ke mono dan resampling
+    from transformers.pipelines.audio_utils import ffmpeg_read
+    return ffmpeg_read(audio_bytes, target_sampling_rate)
+
+
+def as_pipeline_input(audio_input):
+    """
+    Menyiapkan input untuk pipeline ASR. Pipeline mengubah (pop) isi dict input, jadi setiap
+    pemanggilan mendapat dict baru yang tetap menunjuk ke buffer audio yang sama (tanpa salinan).
+    """
+    if isinstance(audio_input, dict):
+        return {"raw": audio_input["raw"], "sampling_rate": audio_input["sampling_rate"]}
+    return audio_input
+
+
+def iter_audio_chunks(audio_source, chunk_length_s=30.0, stride_length_s=5.0):
+    """
+    Mendekode audio secara bertahap (lazy) menjadi potongan-potongan yang saling tumpang tindih.
+    Hanya satu potongan yang berada di memori pada satu waktu, sehingga file berdurasi
+    berjam-jam tetap aman. `audio_source` berupa path atau objek file-like.
+    Menghasilkan dict {"raw": array float32 mono, "sampling_rate": int} per potongan.
+    """
+    if stride_length_s >= chunk_length_s:
+        raise ValueError("Panjang tumpang tindih (stride) harus lebih kecil dari panjang potongan.")
+
+    with sf.SoundFile(audio_source) as audio_file:
+        sampling_rate = audio_file.samplerate
+        blocksize = int(chunk_length_s * sampling_rate)
+        overlap = int(stride_length_s * sampling_rate)
+        for block in audio_file.blocks(blocksize=blocksize, overlap=overlap, dtype="float32", always_2d=True):
+            # Gabungkan kanal stereo menjadi mono
+            yield {"raw": block.mean(axis=1), "sampling_rate": sampling_rate}
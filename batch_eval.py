@@ -0,0 +1,199 @@
+"""
+Evaluasi korpus: mentranskripsi banyak file audio sekaligus dengan inferensi batch
+dan menghitung CER/WER tingkat korpus terhadap transkripsi referensi (ground truth).
+
+Contoh pemakaian:
+    python batch_eval.py data/ --batch-size 8 --output hasil_evaluasi.json
+    python batch_eval.py manifest.jsonl --models openai/whisper-base
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import soundfile as sf
+from jiwer import cer, wer
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac")
+
+
+# --- MEMUAT DATASET (DIREKTORI ATAU MANIFEST) ---
+def load_evaluation_dataset(dataset_path):
+    """
+    Memuat pasangan audio + transkripsi referensi dari:
+    - direktori berisi file audio dengan file .txt bernama sama sebagai referensi, atau
+    - manifest .jsonl (satu objek {"audio": ..., "text": ...} per baris), atau
+    - manifest .csv/.tsv dengan kolom `audio` dan `text`.
+    Path audio relatif dihitung dari lokasi manifest. Mengembalikan list dict {"audio", "reference"}.
+    """
+    items = []
+
+    if os.path.isdir(dataset_path):
+        for file_name in sorted(os.listdir(dataset_path)):
+            stem, extension = os.path.splitext(file_name)
+            if extension.lower() not in AUDIO_EXTENSIONS:
+                continue
+            reference_path = os.path.join(dataset_path, stem + ".txt")
+            if not os.path.exists(reference_path):
+                print(f"Peringatan: referensi untuk '{file_name}' tidak ditemukan, file dilewati.")
+                continue
+            with open(reference_path, encoding="utf-8") as f:
+                items.append({"audio": os.path.join(dataset_path, file_name), "reference": f.read().strip()})
+    else:
+        base_dir = os.path.dirname(os.path.abspath(dataset_path))
+        extension = os.path.splitext(dataset_path)[1].lower()
+        with open(dataset_path, encoding="utf-8", newline="") as f:
+            if extension == ".jsonl":
+                rows = [json.loads(line) for line in f if line.strip()]
+            elif extension in (".csv", ".tsv"):
+                rows = list(csv.DictReader(f, delimiter="\t" if extension == ".tsv" else ","))
+            else:
+                raise ValueError(f"Format manifest tidak didukung: '{extension}'. Gunakan direktori, .jsonl, .csv, atau .tsv.")
+        for row in rows:
+            audio_path = row["audio"]
+            if not os.path.isabs(audio_path):
+                audio_path = os.path.join(base_dir, audio_path)
+            items.append({"audio": audio_path, "reference": str(row["text"]).strip()})
+
+    # jiwer tidak bisa menghitung CER/WER dengan referensi kosong
+    skipped = [item["audio"] for item in items if not item["reference"]]
+    for audio_path in skipped:
+        print(f"Peringatan: referensi untuk '{audio_path}' kosong, file dilewati.")
+    return [item for item in items if item["reference"]]
+
+
+def get_audio_duration(audio_path):
+    """Durasi audio dalam detik dari header file (tanpa mendekode seluruh isi), 0.0 jika tidak terbaca."""
+    try:
+        return sf.info(audio_path).duration
+    except Exception:
+        return 0.0
+
+
+def make_length_sorted_batches(items, batch_size):
+    """
+    Mengurutkan item dari yang terpanjang dan membaginya menjadi batch, sehingga setiap batch
+    berisi audio dengan panjang serupa (padding dan panjang generasi yang terbuang minimal).
+    """
+    sorted_items = sorted(items, key=lambda item: item["audio_duration"], reverse=True)
+    return [sorted_items[i:i + batch_size] for i in range(0, len(sorted_items), batch_size)]
+
+
+# --- EVALUASI ---
+def evaluate_pipeline(asr_pipeline, items, batch_size=8, progress_callback=None, generate_kwargs=None, romaji_transliterator=None):
+    """
+    Mentranskripsi semua item dengan satu pipeline menggunakan inferensi batch,
+    lalu menghitung CER/WER korpus, CER per file, dan real-time factor (RTF).
+    Jika `romaji_transliterator` diberikan, CER juga dihitung pada tingkat Romaji
+    ("romaji_cer"); referensi dan hipotesis ditransliterasi sekaligus dalam satu batch.
+    Catatan: WER dihitung per token yang dipisahkan spasi; untuk teks Jepang tanpa
+    segmentasi kata, CER adalah metrik yang lebih bermakna.
+    """
+    for item in items:
+        if "audio_duration" not in item:
+            item["audio_duration"] = get_audio_duration(item["audio"])
+
+    batches = make_length_sorted_batches(items, batch_size)
+    file_results = []
+    processing_time = 0.0
+
+    for batch_index, batch in enumerate(batches):
+        start_time_batch = time.perf_counter()
+        outputs = asr_pipeline([item["audio"] for item in batch], batch_size=len(batch), generate_kwargs=generate_kwargs or {})
+        processing_time += time.perf_counter() - start_time_batch
+
+        for item, output in zip(batch, outputs):
+            hypothesis = output["text"].strip()
+            file_results.append({
+                "audio": item["audio"],
+                "reference": item["reference"],
+                "hypothesis": hypothesis,
+                "audio_duration": item["audio_duration"],
+                "cer": cer(item["reference"], hypothesis),
+            })
+
+        if progress_callback is not None:
+            progress_callback(batch_index + 1, len(batches))
+
+    references = [result["reference"] for result in file_results]
+    hypotheses = [result["hypothesis"] for result in file_results]
+    total_audio_duration = sum(result["audio_duration"] for result in file_results)
+
+    evaluation = {
+        "num_files": len(file_results),
+        "cer": cer(references, hypotheses) if file_results else 0.0,
+        "wer": wer(references, hypotheses) if file_results else 0.0,
+        "audio_duration": total_audio_duration,
+        "processing_time": processing_time,
+        "rtf": processing_time / total_audio_duration if total_audio_duration > 0 else 0.0,
+        "files": sorted(file_results, key=lambda result: result["audio"]),
+    }
+
+    if romaji_transliterator is not None and file_results:
+        romaji_texts = romaji_transliterator.normalize_many_for_comparison(references + hypotheses)
+        romaji_references, romaji_hypotheses = romaji_texts[:len(references)], romaji_texts[len(references):]
+        for result, romaji_reference, romaji_hypothesis in zip(file_results, romaji_references, romaji_hypotheses):
+            result["romaji_cer"] = cer(romaji_reference, romaji_hypothesis) if romaji_reference else 0.0
+        # Referensi yang kosong setelah normalisasi (mis. hanya tanda baca) tidak ikut dihitung
+        romaji_pairs = [(ref, hyp) for ref, hyp in zip(romaji_references, romaji_hypotheses) if ref]
+        evaluation["romaji_cer"] = cer([ref for ref, _ in romaji_pairs], [hyp for _, hyp in romaji_pairs]) if romaji_pairs else 0.0
+
+    return evaluation
+
+
+def format_evaluation_summary(model_name, evaluation):
+    romaji_summary = f" | CER Romaji {evaluation['romaji_cer'] * 100:.2f}%" if "romaji_cer" in evaluation else ""
+    return (
+        f"{model_name}: CER {evaluation['cer'] * 100:.2f}%{romaji_summary} | WER {evaluation['wer'] * 100:.2f}% | "
+        f"{evaluation['num_files']} file, audio {evaluation['audio_duration']:.1f} dtk, "
+        f"proses {evaluation['processing_time']:.1f} dtk, RTF {evaluation['rtf']:.3f}"
+    )
+
+
+# --- ENTRY POINT BARIS PERINTAH ---
+def main(argv=None):
+    from asr_models import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Evaluasi CER/WER korpus audio Jepang terhadap transkripsi referensi.")
+    parser.add_argument("dataset", help="Direktori audio + .txt referensi, atau manifest .jsonl/.csv/.tsv")
+    parser.add_argument("--models", nargs="+", help="ID model Hugging Face yang dievaluasi (bawaan: model default di models.json)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Jumlah audio per batch inferensi")
+    parser.add_argument("--output", help="Simpan hasil lengkap (termasuk per file) ke file JSON ini")
+    parser.add_argument("--romaji", action="store_true", help="Hitung juga CER pada tingkat Romaji (perbedaan Kanji/Kana dengan bacaan sama diabaikan)")
+    args = parser.parse_args(argv)
+
+    romaji_transliterator = None
+    if args.romaji:
+        from romaji import RomajiTransliterator
+        romaji_transliterator = RomajiTransliterator()
+
+    model_registry = ModelRegistry.from_config()
+    model_ids = args.models or model_registry.default_model_ids()
+
+    items = load_evaluation_dataset(args.dataset)
+    if not items:
+        parser.error("Tidak ada pasangan audio + referensi yang ditemukan.")
+    print(f"Memuat {len(items)} file dari '{args.dataset}'.")
+
+    all_results = {}
+    for model_name in model_ids:
+        print(f"Memuat model '{model_name}'...")
+        asr_pipeline = model_registry.get_pipeline(model_name)
+        evaluation = evaluate_pipeline(
+            asr_pipeline, items, args.batch_size,
+            progress_callback=lambda done, total: print(f"  batch {done}/{total}", end="\r"),
+            generate_kwargs=model_registry.get_generate_kwargs(model_name),
+            romaji_transliterator=romaji_transliterator,
+        )
+        print(format_evaluation_summary(model_name, evaluation))
+        all_results[model_name] = evaluation
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, ensure_ascii=False, indent=2)
+        print(f"Hasil disimpan ke '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
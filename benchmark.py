@@ -0,0 +1,215 @@
+"""
+Benchmark ASR yang dapat diulang: latensi p50/p95, real-time factor (RTF), token/detik,
+dan puncak RSS per tahap (dekode, ekstraksi fitur, encoder, decoder) untuk setiap model
+dan panjang audio. Setiap kasus dijalankan dengan jalur dan konfigurasi decoding yang sama
+dengan aplikasi (mis. beam search bawaan model); audio lebih dari 30 detik memakai decoding
+long-form seperti pada aplikasi, sehingga RTF selalu dihitung dari audio yang benar-benar
+ditranskripsi. Hasil ditulis ke JSON agar bisa dibandingkan antar run.
+
+Contoh pemakaian:
+    python benchmark.py --audio contoh.wav --lengths 5 15 30 --repeats 5 --output bench.json
+    python benchmark.py --audio contoh.wav --baseline bench_lama.json --output bench_baru.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from asr_models import DEFAULT_BACKEND, INFERENCE_BACKENDS, ModelRegistry
+from audio_utils import TARGET_SAMPLING_RATE, decode_audio_bytes
+from profiling import run_staged_transcription
+
+# Panjang jendela input Whisper (detik); audio yang lebih panjang memakai decoding long-form
+WHISPER_WINDOW_S = 30.0
+
+# Ambang kenaikan latensi p50 (%) yang dilaporkan sebagai regresi saat dibandingkan dengan baseline
+REGRESSION_THRESHOLD_PERCENT = 10.0
+
+
+def percentile(values, percent):
+    """Persentil dengan interpolasi linear (sama dengan numpy.percentile bawaan)."""
+    return float(np.percentile(values, percent)) if values else 0.0
+
+
+def make_benchmark_audio(source_samples, length_s):
+    """
+    Membuat audio WAV (bytes) sepanjang `length_s` detik dari sampel sumber yang diulang/dipotong,
+    sehingga tahap dekode ikut terukur seperti pada unggahan sungguhan.
+    """
+    num_samples = int(length_s * TARGET_SAMPLING_RATE)
+    repeats = int(np.ceil(num_samples / len(source_samples)))
+    samples = np.tile(source_samples, repeats)[:num_samples]
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, TARGET_SAMPLING_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def make_synthetic_samples(length_s=30.0):
+    """Sinyal sintetis (nada bertingkat + derau) sebagai cadangan jika tidak ada file audio."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(length_s * TARGET_SAMPLING_RATE)) / TARGET_SAMPLING_RATE
+    tone = 0.3 * np.sin(2 * np.pi * (200 + 50 * np.floor(t)) * t)
+    return (tone + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def describe_decoding(asr_pipeline, generate_kwargs=None):
+    """Konfigurasi decoding efektif (konfigurasi generasi pipeline digabung dengan generate_kwargs model)."""
+    generation_config = getattr(asr_pipeline, "generation_config", None) or getattr(asr_pipeline.model, "generation_config", None)
+    generate_kwargs = generate_kwargs or {}
+    return {
+        "num_beams": generate_kwargs.get("num_beams", getattr(generation_config, "num_beams", 1) or 1),
+        "do_sample": generate_kwargs.get("do_sample", getattr(generation_config, "do_sample", False) or False),
+        **{key: value for key, value in generate_kwargs.items() if key not in ("num_beams", "do_sample")},
+    }
+
+
+def benchmark_case(asr_pipeline, audio_bytes, length_s, warmup, repeats, generate_kwargs=None):
+    """Menjalankan satu kombinasi model × panjang audio dan merangkum statistiknya."""
+    for _ in range(warmup):
+        run_staged_transcription(asr_pipeline, audio_bytes, generate_kwargs)
+
+    totals = []
+    token_counts = []
+    stage_durations = {}
+    stage_peaks = {}
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = run_staged_transcription(asr_pipeline, audio_bytes, generate_kwargs)
+        totals.append(time.perf_counter() - start_time)
+        token_counts.append(result["num_tokens"])
+        for stage_name, stage in result["stages"].items():
+            stage_durations.setdefault(stage_name, []).append(stage["duration"])
+            stage_peaks[stage_name] = max(stage_peaks.get(stage_name, 0.0), stage["peak_rss_mb"])
+
+    decoding_stage = "decoder" if "decoder" in stage_durations else "encoder+decoder"
+    decoding_p50 = percentile(stage_durations[decoding_stage], 50)
+    latency_p50 = percentile(totals, 50)
+    return {
+        "audio_length_s": length_s,
+        "long_form": length_s > WHISPER_WINDOW_S,
+        "decoding": describe_decoding(asr_pipeline, generate_kwargs),
+        "runs": repeats,
+        "latency_p50_s": latency_p50,
+        "latency_p95_s": percentile(totals, 95),
+        "rtf": latency_p50 / length_s,
+        "tokens": int(statistics.median(token_counts)),
+        "tokens_per_s": statistics.median(token_counts) / decoding_p50 if decoding_p50 > 0 else 0.0,
+        "stages": {
+            stage_name: {
+                "p50_s": percentile(durations, 50),
+                "p95_s": percentile(durations, 95),
+                "peak_rss_mb": stage_peaks[stage_name],
+            }
+            for stage_name, durations in stage_durations.items()
+        },
+    }
+
+
+def compare_with_baseline(results, baseline, threshold_percent=REGRESSION_THRESHOLD_PERCENT):
+    """
+    Mencetak perubahan latensi p50 terhadap hasil benchmark sebelumnya. Kasus dengan konfigurasi
+    decoding berbeda (mis. baseline lama yang greedy) dilewati karena tidak sebanding.
+    Mengembalikan jumlah regresi.
+    """
+    baseline_cases = {
+        (case["model"], case["backend"], case["audio_length_s"]): case
+        for case in baseline.get("results", [])
+    }
+    regressions = 0
+    for case in results["results"]:
+        previous = baseline_cases.get((case["model"], case["backend"], case["audio_length_s"]))
+        if previous is None or previous["latency_p50_s"] <= 0:
+            continue
+        if previous.get("decoding") != case.get("decoding"):
+            print(f"{case['model']} [{case['backend']}] {case['audio_length_s']:>5.1f} dtk: "
+                  f"konfigurasi decoding berbeda dengan baseline, dilewati")
+            continue
+        change_percent = (case["latency_p50_s"] - previous["latency_p50_s"]) / previous["latency_p50_s"] * 100
+        marker = ""
+        if change_percent > threshold_percent:
+            marker = "  <-- REGRESI"
+            regressions += 1
+        print(f"{case['model']} [{case['backend']}] {case['audio_length_s']:>5.1f} dtk: "
+              f"p50 {previous['latency_p50_s']:.3f} -> {case['latency_p50_s']:.3f} dtk ({change_percent:+.1f}%){marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark latensi, RTF, token/detik, dan puncak memori model ASR.")
+    parser.add_argument("--audio", help="File audio sumber (diulang/dipotong sesuai --lengths). Bawaan: sinyal sintetis.")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[5.0, 15.0, 30.0], help="Panjang audio yang diuji (detik); lebih dari 30 detik memakai decoding long-form seperti aplikasi")
+    parser.add_argument("--models", nargs="+", help="ID model (bawaan: model default di models.json)")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(INFERENCE_BACKENDS), help="Backend inferensi")
+    parser.add_argument("--warmup", type=int, default=1, help="Jumlah iterasi pemanasan (tidak diukur)")
+    parser.add_argument("--repeats", type=int, default=5, help="Jumlah iterasi yang diukur")
+    parser.add_argument("--threads", type=int, help="Jumlah thread intra-op torch (bawaan: bawaan torch)")
+    parser.add_argument("--output", help="Tulis hasil ke file JSON ini")
+    parser.add_argument("--baseline", help="File JSON hasil benchmark sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+    if any(length_s <= 0 for length_s in args.lengths):
+        parser.error("--lengths harus lebih dari 0 detik")
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            source_samples = decode_audio_bytes(f.read())
+    else:
+        print("Peringatan: --audio tidak diberikan, memakai sinyal sintetis (jumlah token tidak mewakili ucapan nyata).")
+        source_samples = make_synthetic_samples()
+
+    model_registry = ModelRegistry.from_config()
+    model_ids = args.models or model_registry.default_model_ids()
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "audio": args.audio or "synthetic",
+            "warmup": args.warmup,
+            "repeats": args.repeats,
+        },
+        "results": [],
+    }
+
+    for model_id in model_ids:
+        print(f"Memuat model '{model_id}' ({args.backend})...")
+        asr_pipeline = model_registry.get_pipeline(model_id, args.backend)
+        for length_s in args.lengths:
+            audio_bytes = make_benchmark_audio(source_samples, length_s)
+            case = benchmark_case(asr_pipeline, audio_bytes, length_s, args.warmup, args.repeats, model_registry.get_generate_kwargs(model_id))
+            case = {"model": model_id, "backend": args.backend, **case}
+            results["results"].append(case)
+            stage_summary = ", ".join(f"{name} {stage['p50_s'] * 1000:.0f} ms/{stage['peak_rss_mb']:.0f} MB" for name, stage in case["stages"].items())
+            print(f"  {length_s:>5.1f} dtk: p50 {case['latency_p50_s']:.3f} dtk, p95 {case['latency_p95_s']:.3f} dtk, "
+                  f"RTF {case['rtf']:.3f}, {case['tokens_per_s']:.1f} token/dtk, beam {case['decoding']['num_beams']}"
+                  f"{' (long-form)' if case['long_form'] else ''} | {stage_summary}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Hasil disimpan ke '{args.output}'.")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nPerbandingan dengan baseline '{args.baseline}':")
+        if compare_with_baseline(results, baseline) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Antarmuka baris perintah untuk perbandingan ASR tanpa Streamlit.
+
+Contoh pemakaian:
+    python cli.py transcribe contoh.wav --models openai/whisper-base litagin/anime-whisper
+    python cli.py transcribe contoh.wav --romaji --vad --output hasil.json
+    python cli.py transcribe contoh.wav --models openai/whisper-base openai/whisper-medium --assisted
+    python cli.py serve --host 127.0.0.1 --port 8000
+    python cli.py batch data/ --batch-size 8 --output hasil_evaluasi.json
+"""
+import argparse
+import json
+import sys
+
+
+def cmd_transcribe(args):
+    from comparison import compare_audio
+
+    transcription_cache = None
+    if not args.no_cache:
+        from asr_cache import TranscriptionCache
+        transcription_cache = TranscriptionCache()
+
+    romaji_transliterator = None
+    if args.romaji:
+        from romaji import RomajiTransliterator
+        romaji_transliterator = RomajiTransliterator()
+
+    model_registry = None
+    model_backends = None
+    if args.backend:
+        from asr_models import ModelRegistry
+        model_registry = ModelRegistry.from_config()
+        model_backends = {model_id: args.backend for model_id in args.models or model_registry.default_model_ids()}
+    result = compare_audio(args.audio, args.models, model_registry, model_backends=model_backends,
+                           transcription_cache=transcription_cache, romaji_transliterator=romaji_transliterator, vad=args.vad,
+                           assisted=args.assisted)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Hasil disimpan ke '{args.output}'.", file=sys.stderr)
+    else:
+        print(output)
+    return 1 if any(model["error"] for model in result["models"]) else 0
+
+
+def cmd_serve(args):
+    from server import serve
+
+    serve(args.host, args.port, use_cache=not args.no_cache)
+    return 0
+
+
+def cmd_batch(args):
+    from batch_eval import main as batch_eval_main
+
+    batch_eval_main(args.batch_args)
+    return 0
+
+
+def main(argv=None):
+    from asr_models import INFERENCE_BACKENDS
+    from server import DEFAULT_HOST, DEFAULT_PORT
+
+    parser = argparse.ArgumentParser(description="Perbandingan model ASR audio Jepang tanpa Streamlit.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    transcribe_parser = subparsers.add_parser("transcribe", help="Transkripsi satu file audio dengan beberapa model dan bandingkan hasilnya (JSON)")
+    transcribe_parser.add_argument("audio", help="File audio (.wav, .mp3, .flac)")
+    transcribe_parser.add_argument("--models", nargs="+", help="ID model (bawaan: model default di models.json)")
+    transcribe_parser.add_argument("--backend", choices=list(INFERENCE_BACKENDS), help="Backend inferensi untuk semua model yang ditranskripsi (bawaan: backend di models.json)")
+    transcribe_parser.add_argument("--romaji", action="store_true", help="Hitung CER pada tingkat Romaji")
+    transcribe_parser.add_argument("--vad", action="store_true", help="Buang bagian senyap dan transkripsi per segmen ucapan")
+    transcribe_parser.add_argument("--assisted", action="store_true", help="Ukur juga decoding biasa vs decoding berbantuan (model draf) untuk model yang memiliki draft_model")
+    transcribe_parser.add_argument("--no-cache", action="store_true", help="Jangan pakai cache hasil transkripsi")
+    transcribe_parser.add_argument("--output", help="Tulis hasil JSON ke file ini (bawaan: stdout)")
+    transcribe_parser.set_defaults(func=cmd_transcribe)
+
+    serve_parser = subparsers.add_parser("serve", help="Jalankan endpoint HTTP lokal (lihat server.py)")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--no-cache", action="store_true", help="Jangan pakai cache hasil transkripsi")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    batch_parser = subparsers.add_parser("batch", help="Evaluasi korpus terhadap transkripsi referensi (argumen diteruskan ke batch_eval.py)")
+    batch_parser.add_argument("batch_args", nargs=argparse.REMAINDER)
+    batch_parser.set_defaults(func=cmd_batch)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+Logika inti perbandingan ASR tanpa ketergantungan pada Streamlit: transkripsi beberapa model,
+CER antar model, dan ringkasan perbandingan dalam bentuk dict yang bisa langsung dijadikan JSON.
+Dipakai oleh aplikasi Streamlit, `cli.py`, dan `server.py`. Mengimpor modul ini tidak memuat
+torch maupun model apa pun; model baru dimuat saat pertama kali dipakai.
+
+Contoh pemakaian:
+    from comparison import compare_audio
+    with open("contoh.wav", "rb") as f:
+        hasil = compare_audio(f.read(), ["openai/whisper-base", "litagin/anime-whisper"])
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asr_cache import compute_audio_hash
+from audio_utils import TARGET_SAMPLING_RATE, as_pipeline_input, decode_audio_bytes
+from text_diff import align_texts, edit_distance
+from vad import join_segment_texts, segment_speech, segments_signature
+
+QUEUE_POLL_INTERVAL_S = 0.25
+# Jumlah segmen ucapan (hasil VAD) per batch inferensi jika tidak memakai penjadwal
+VAD_BATCH_SIZE = 8
+# Direktori penyimpanan trace torch profiler
+TRACE_DIR = os.environ.get("ASR_TRACE_DIR", ".asr_traces")
+
+
+# --- TRANSKRIPSI ---
+def run_asr_inference(audio_input, model_id, model_registry, num_threads=None, transcription_cache=None, backend=None, profile_stages=False, export_trace=False,
+                      scheduler=None, on_queue_position=None, speech=None):
+    """
+    Menjalankan model ASR dari registry pada satu audio (path file atau dict {"raw", "sampling_rate"}) tanpa
+    memanggil elemen UI Streamlit, sehingga aman dipanggil dari thread pekerja.
+    Mengembalikan dict {"text", "duration", "cache_hit", "inference_duration"} plus kunci tambahan per opsi.
+    """
+    # profile_stages: selalu tanpa cache dan dengan audio utuh; hasil juga berisi "stages" dan "trace_path"
+    if profile_stages:
+        import torch
+        from profiling import profile_transcription
+
+        trace_path = None
+        if export_trace:
+            trace_path = os.path.join(TRACE_DIR, f"{model_id.replace('/', '--')}_{backend or model_registry.get_backend(model_id)}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+        def profile_stages_once():
+            asr_pipeline = model_registry.get_pipeline(model_id, backend)
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            return profile_transcription(asr_pipeline, audio_input, model_registry.get_generate_kwargs(model_id), trace_path)
+
+        if scheduler is not None:
+            # Profil per tahap memakai model secara langsung, jadi dijalankan sebagai pekerjaan eksklusif
+            profiled = scheduler.run_exclusive(model_id, profile_stages_once, backend, on_queue_position)
+        else:
+            profiled = profile_stages_once()
+        return {
+            "text": profiled["text"],
+            "duration": profiled["duration"],
+            "cache_hit": None,
+            "inference_duration": profiled["duration"],
+            "stages": profiled["stages"],
+            "trace_path": profiled["trace_path"],
+        }
+
+    start_time_asr = time.perf_counter()
+
+    # transcription_cache: audio dan konfigurasi model yang sama diambil dari cache tanpa memuat model
+    cache_key = None
+    if transcription_cache is not None:
+        fingerprint = model_registry.fingerprint(model_id, backend)
+        if speech is not None:
+            fingerprint += "|" + segments_signature(speech)
+        cache_key = transcription_cache.make_key(compute_audio_hash(audio_input), fingerprint)
+        cached = transcription_cache.get(cache_key)
+        if cached is not None:
+            return {
+                "text": cached["text"],
+                "duration": time.perf_counter() - start_time_asr,
+                "cache_hit": True,
+                "inference_duration": cached["duration"],
+            }
+
+    cache_lookup_duration = time.perf_counter() - start_time_asr
+
+    # speech (hasil segment_speech): hanya segmen ucapan yang ditranskripsi per batch; hasil juga berisi
+    # "segments" [{"start", "end", "text"}] dengan waktu pada audio asli
+    if speech is not None and not speech["segments"]:
+        # Tidak ada ucapan terdeteksi: model tidak perlu dijalankan sama sekali
+        return {"text": "", "duration": cache_lookup_duration, "cache_hit": None, "inference_duration": 0.0, "segments": []}
+
+    # scheduler: pekerja penjadwal memuat model, membagi thread torch, dan menggabungkan permintaan per batch;
+    # hasil juga berisi "queue_wait" dan "batch_size", dan QueueFullError diteruskan jika antrean penuh.
+    # on_queue_position(posisi) dipanggil dari thread pemanggil selama menunggu.
+    if scheduler is not None:
+        scheduled = scheduler.transcribe(model_id, audio_input if speech is None else speech["segments"], backend, on_queue_position)
+        text = scheduled["text"] if speech is None else join_segment_texts(scheduled["texts"])
+        if cache_key is not None:
+            transcription_cache.put(cache_key, model_id, text, scheduled["inference_duration"])
+        result = {
+            "text": text,
+            "duration": cache_lookup_duration + scheduled["inference_duration"],
+            "cache_hit": False if transcription_cache is not None else None,
+            "inference_duration": scheduled["inference_duration"],
+            "queue_wait": scheduled["queue_wait"],
+            "batch_size": scheduled["batch_size"],
+        }
+        if speech is not None:
+            result["segments"] = _map_segment_texts(speech, scheduled["texts"])
+        return result
+
+    # Model dimuat saat pertama kali dibutuhkan (backend bawaan: backend model di registry);
+    # waktu muat tidak dihitung sebagai waktu transkripsi
+    asr_pipeline = model_registry.get_pipeline(model_id, backend)
+    if num_threads:
+        import torch
+        # Anggaran thread intra-op torch untuk thread pemanggil ini saja
+        torch.set_num_threads(num_threads)
+    start_time_inference = time.perf_counter()
+    if speech is None:
+        text = asr_pipeline(as_pipeline_input(audio_input), generate_kwargs=model_registry.get_generate_kwargs(model_id))["text"]
+    else:
+        segment_outputs = list(asr_pipeline(
+            [as_pipeline_input(segment) for segment in speech["segments"]],
+            batch_size=min(VAD_BATCH_SIZE, len(speech["segments"])),
+            generate_kwargs=model_registry.get_generate_kwargs(model_id),
+        ))
+        segment_texts = [output["text"] for output in segment_outputs]
+        text = join_segment_texts(segment_texts)
+    inference_duration = time.perf_counter() - start_time_inference
+
+    if cache_key is not None:
+        transcription_cache.put(cache_key, model_id, text, inference_duration)
+
+    result = {
+        "text": text,
+        "duration": cache_lookup_duration + inference_duration,
+        "cache_hit": False if transcription_cache is not None else None,
+        "inference_duration": inference_duration,
+    }
+    if speech is not None:
+        result["segments"] = _map_segment_texts(speech, segment_texts)
+    return result
+
+
+def _map_segment_texts(speech, segment_texts):
+    # Teks setiap segmen dipasangkan dengan waktunya pada audio asli (sebelum senyap dibuang)
+    return [
+        {"start": segment["start"], "end": segment["end"], "text": segment_text.strip()}
+        for segment, segment_text in zip(speech["segments"], segment_texts)
+    ]
+
+
+def measure_assisted_decoding(audio_input, model_id, model_registry, backend=None, num_threads=None, scheduler=None, on_queue_position=None):
+    """
+    Membandingkan decoding biasa dan decoding berbantuan (speculative) model yang sama pada satu audio:
+    model draf (`draft_model` di models.json) mengusulkan beberapa token sekaligus dan model target
+    hanya memverifikasinya, sehingga jumlah langkah decoder model besar berkurang. Keduanya memakai
+    greedy decoding sehingga hasilnya seharusnya identik; "identical" memastikannya. Keduanya dijalankan tanpa
+    cache setelah pemanasan dengan potongan audio 1 detik. Jika draf tidak ada, tidak kompatibel,
+    atau gagal, hanya decoding biasa yang diukur dan "fallback_reason" berisi alasannya.
+    Jika `scheduler` diberikan, pengukuran diantrekan sebagai pekerjaan eksklusif pada model tersebut
+    (lihat `InferenceScheduler.run_exclusive`) sehingga tidak berjalan bersamaan dengan batch lain;
+    QueueFullError diteruskan jika antrean penuh.
+    Mengembalikan dict {"model_id", "draft_model", "plain_duration", "assisted_duration", "speedup",
+    "identical", "text", "assisted_text", "fallback_reason"}.
+    """
+    if scheduler is not None:
+        return scheduler.run_exclusive(
+            model_id, lambda: measure_assisted_decoding(audio_input, model_id, model_registry, backend), backend, on_queue_position,
+        )
+
+    asr_pipeline = model_registry.get_pipeline(model_id, backend)
+    assistant_model, draft_id, fallback_reason = model_registry.get_assistant_model(model_id, backend)
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    # Decoding berbantuan selalu greedy, jadi baseline juga dipaksa greedy (pipeline transformers
+    # terbaru memakai beam search 5 jika generation_config model tidak menentukan num_beams)
+    generate_kwargs = {**model_registry.get_generate_kwargs(model_id), "num_beams": 1}
+    warmup_input = {"raw": audio_input["raw"][:audio_input["sampling_rate"]], "sampling_rate": audio_input["sampling_rate"]}
+
+    def timed_transcription(decode_kwargs):
+        asr_pipeline(as_pipeline_input(warmup_input), generate_kwargs=decode_kwargs)
+        start_time_inference = time.perf_counter()
+        text = asr_pipeline(as_pipeline_input(audio_input), generate_kwargs=decode_kwargs)["text"]
+        return text, time.perf_counter() - start_time_inference
+
+    plain_text, plain_duration = timed_transcription(generate_kwargs)
+    result = {
+        "model_id": model_id,
+        "draft_model": draft_id,
+        "plain_duration": plain_duration,
+        "assisted_duration": None,
+        "speedup": None,
+        "identical": None,
+        "text": plain_text,
+        "assisted_text": None,
+        "fallback_reason": fallback_reason,
+    }
+    if assistant_model is None:
+        return result
+
+    try:
+        assisted_text, assisted_duration = timed_transcription({**generate_kwargs, "assistant_model": assistant_model})
+    except Exception as e:
+        print(f"Peringatan: decoding berbantuan '{model_id}' dengan draf '{draft_id}' gagal ({e}); memakai decoding biasa.")
+        result["fallback_reason"] = f"decoding berbantuan gagal: {type(e).__name__}: {e}"
+        return result
+    result.update({
+        "assisted_duration": assisted_duration,
+        "speedup": plain_duration / assisted_duration if assisted_duration > 0 else None,
+        "identical": assisted_text.strip() == plain_text.strip(),
+        "assisted_text": assisted_text,
+    })
+    return result
+
+
+def transcribe_models_concurrently(audio_input, model_ids, model_registry, transcription_cache=None, model_backends=None, profile_stages=False, export_trace=False,
+                                  scheduler=None, on_queue_positions=None, speech=None):
+    """
+    Mentranskripsi audio yang sama dengan beberapa model ASR secara bersamaan
+    menggunakan thread pool. Inti CPU dibagi rata antar model agar thread torch
+    tidak saling berebut. `model_backends` memetakan model_id ke backend inferensi.
+    Jika `scheduler` diberikan, inferensi diantrekan ke penjadwal bersama (setiap pekerja
+    memakai anggaran thread tetap, lihat `InferenceScheduler.threads_per_worker`).
+    `on_queue_positions({model_id: posisi})` dipanggil berkala dari thread pemanggil
+    (bukan thread pekerja) selama ada model yang masih menunggu di antrean.
+    `speech` (hasil `segment_speech`) dihitung sekali lalu dipakai bersama oleh semua model.
+    Mengembalikan dict {model_id: (hasil_inferensi, error)}.
+    """
+    model_backends = model_backends or {}
+    num_models = max(1, len(model_ids))
+    threads_per_model = None if scheduler is not None else max(1, (os.cpu_count() or 1) // num_models)
+    queue_positions = {}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=num_models) as executor:
+        futures = {
+            model_id: executor.submit(
+                run_asr_inference, audio_input, model_id, model_registry, threads_per_model,
+                transcription_cache, model_backends.get(model_id), profile_stages, export_trace,
+                scheduler, lambda position, model_id=model_id: queue_positions.__setitem__(model_id, position), speech,
+            )
+            for model_id in model_ids
+        }
+        # Callback dipanggil dari thread pemanggil, sehingga aman untuk memperbarui elemen UI Streamlit
+        while on_queue_positions is not None and not all(future.done() for future in futures.values()):
+            on_queue_positions({model_id: position for model_id, position in queue_positions.items() if position > 0 and not futures[model_id].done()})
+            time.sleep(QUEUE_POLL_INTERVAL_S)
+
+        for model_id, future in futures.items():
+            try:
+                results[model_id] = (future.result(), None)
+            except Exception as e:
+                failed_result = {"text": "Error saat transkripsi.", "duration": 0.0, "cache_hit": None, "inference_duration": 0.0}
+                results[model_id] = (failed_result, e)
+    return results
+
+
+# --- RINGKASAN PERBANDINGAN ---
+def comparison_entry(label, inference_result):
+    """
+    Entri satu model untuk `summarize_comparison`. Pada cache HIT, "duration" hasil inferensi hanya
+    waktu pencarian cache, jadi waktu inferensi asli yang tersimpan dipakai untuk perbandingan kecepatan.
+    """
+    cache_hit = bool(inference_result.get("cache_hit"))
+    return {
+        "label": label,
+        "text": inference_result["text"],
+        "duration": inference_result["inference_duration"] if cache_hit else inference_result["duration"],
+        "cache_hit": cache_hit,
+        "stages": inference_result.get("stages"),
+    }
+
+
+def compute_pairwise_cer_matrix(texts, reference_alignments=None):
+    """
+    Menghitung matriks CER (%) antar semua pasangan transkripsi: baris = acuan, kolom = hipotesis.
+    Sel berisi None jika teks acuan kosong (CER tidak terdefinisi). Jarak edit bersifat simetris,
+    jadi setiap pasangan hanya disejajarkan sekali untuk kedua arah; `reference_alignments`
+    (hasil `align_texts` teks pertama vs teks lainnya) dipakai ulang jika diberikan.
+    """
+    matrix = [[None] * len(texts) for _ in texts]
+    for i, text_i in enumerate(texts):
+        for j in range(i, len(texts)):
+            if i == j:
+                distance = 0
+            elif i == 0 and reference_alignments is not None:
+                distance = reference_alignments[j - 1]["distance"]
+            else:
+                distance = edit_distance(text_i, texts[j])
+            if text_i:
+                matrix[i][j] = distance / len(text_i) * 100
+            if texts[j]:
+                matrix[j][i] = distance / len(texts[j]) * 100
+    return matrix
+
+
+def summarize_comparison(results, romaji_transliterator=None, alignments=None):
+    """
+    Ringkasan perbandingan N transkripsi tanpa elemen UI. `results` adalah list dict
+    {"label", "text", "duration", "cache_hit"} (lihat `comparison_entry`); hasil pertama menjadi acuan. Jika `romaji_transliterator`
+    diberikan, CER dan jumlah S/D/I dihitung pada tingkat Romaji. `alignments` (hasil
+    `align_texts` acuan vs model lain pada teks asli) dipakai ulang jika diberikan.
+    Mengembalikan dict {"reference", "cer_level", "pairs", "cer_matrix", "average_cer", "fastest", "slowest",
+    "speed_diff_percent", "cached"}; "cached" berisi label model yang waktunya diambil dari cache.
+    """
+    cleaned_texts = [result["text"].strip() for result in results]
+    cer_texts = cleaned_texts
+    if romaji_transliterator is not None:
+        cer_texts = romaji_transliterator.normalize_many_for_comparison(cleaned_texts)
+        alignments = None
+    if alignments is None:
+        alignments = [align_texts(cer_texts[0], other_text) for other_text in cer_texts[1:]]
+
+    cer_matrix = compute_pairwise_cer_matrix(cer_texts, alignments)
+    pairwise_cers = [cer_matrix[i][j] for i in range(len(results)) for j in range(len(results)) if i != j and cer_matrix[i][j] is not None]
+
+    sorted_by_duration = sorted(results, key=lambda result: result["duration"])
+    fastest, slowest = sorted_by_duration[0], sorted_by_duration[-1]
+    speed_diff_percent = 0.0
+    if slowest["duration"] > 0:
+        speed_diff_percent = (slowest["duration"] - fastest["duration"]) / slowest["duration"] * 100
+
+    return {
+        "reference": results[0]["label"],
+        "cer_level": "romaji" if romaji_transliterator is not None else "karakter",
+        "pairs": [
+            {
+                "hypothesis": other["label"],
+                "cer": alignment["cer"] * 100 if alignment["cer"] is not None else None,
+                "substitutions": alignment["substitutions"],
+                "deletions": alignment["deletions"],
+                "insertions": alignment["insertions"],
+            }
+            for other, alignment in zip(results[1:], alignments)
+        ],
+        "cer_matrix": cer_matrix,
+        "average_cer": sum(pairwise_cers) / len(pairwise_cers) if pairwise_cers else None,
+        "fastest": fastest["label"],
+        "slowest": slowest["label"],
+        "speed_diff_percent": speed_diff_percent,
+        "cached": [result["label"] for result in results if result.get("cache_hit")],
+    }
+
+
+def load_audio_input(audio):
+    """Mendekode audio (bytes isi file atau path) sekali menjadi dict {"raw", "sampling_rate"} di memori."""
+    if isinstance(audio, dict):
+        return audio
+    if not isinstance(audio, (bytes, bytearray)):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    return {"raw": decode_audio_bytes(bytes(audio)), "sampling_rate": TARGET_SAMPLING_RATE}
+
+
+def compare_audio(audio, model_ids=None, model_registry=None, model_backends=None, transcription_cache=None,
+                  scheduler=None, romaji_transliterator=None, vad=False, assisted=False):
+    """
+    Mentranskripsi satu audio (bytes, path, atau dict hasil dekode) dengan beberapa model secara
+    bersamaan lalu membandingkan hasilnya. Tanpa `model_ids`, model default di registry dipakai.
+    Jika `vad` aktif, bagian senyap dibuang dan hanya segmen ucapan yang ditranskripsi.
+    Jika `assisted` aktif, setiap model yang memiliki `draft_model` juga diukur dengan decoding biasa
+    dan decoding berbantuan (lihat `measure_assisted_decoding`) setelah perbandingan selesai.
+    Model yang gagal tetap dilaporkan dengan "error" dan tidak ikut dalam ringkasan.
+    Mengembalikan dict yang bisa langsung dijadikan JSON:
+    {"audio_duration", "total_duration", "vad": dict atau None, "models": [...], "summary": dict atau None,
+    "assisted": list atau None}.
+    """
+    if model_registry is None:
+        from asr_models import ModelRegistry
+        model_registry = ModelRegistry.from_config()
+    model_ids = list(model_ids or model_registry.default_model_ids())
+    model_backends = {model_id: (model_backends or {}).get(model_id) or model_registry.get_backend(model_id) for model_id in model_ids}
+
+    audio_input = load_audio_input(audio)
+    start_time_total = time.perf_counter()
+    speech = segment_speech(audio_input) if vad else None
+    concurrent_results = transcribe_models_concurrently(
+        audio_input, model_ids, model_registry, transcription_cache, model_backends, scheduler=scheduler, speech=speech,
+    )
+    total_duration = time.perf_counter() - start_time_total
+
+    models = []
+    for model_id, (inference_result, error) in concurrent_results.items():
+        models.append({
+            "id": model_id,
+            "label": model_registry.get_label(model_id, model_backends[model_id]),
+            "backend": model_backends[model_id],
+            "text": inference_result["text"] if error is None else None,
+            "duration": inference_result["duration"],
+            "inference_duration": inference_result["inference_duration"],
+            "cache_hit": inference_result["cache_hit"],
+            "queue_wait": inference_result.get("queue_wait"),
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "error_type": type(error).__name__ if error is not None else None,
+            "segments": inference_result.get("segments"),
+        })
+
+    successful = [comparison_entry(model["label"], model) for model in models if model["error"] is None]
+
+    assisted_results = None
+    if assisted:
+        # Diukur berurutan setelah perbandingan agar waktu tidak terganggu model lain yang berjalan bersamaan
+        assisted_results = []
+        for model_id in model_ids:
+            if not model_registry.get_spec(model_id)["draft_model"]:
+                continue
+            try:
+                assisted_results.append(measure_assisted_decoding(audio_input, model_id, model_registry, model_backends[model_id], scheduler=scheduler))
+            except Exception as e:
+                assisted_results.append({
+                    "model_id": model_id,
+                    "draft_model": model_registry.get_spec(model_id)["draft_model"],
+                    "error": f"{type(e).__name__}: {e}",
+                    "error_type": type(e).__name__,
+                })
+
+    return {
+        "audio_duration": len(audio_input["raw"]) / audio_input["sampling_rate"],
+        "total_duration": total_duration,
+        "vad": {
+            "num_segments": len(speech["segments"]),
+            "speech_duration": speech["speech_duration"],
+            "speech_ratio": speech["speech_ratio"],
+        } if speech is not None else None,
+        "models": models,
+        "summary": summarize_comparison(successful, romaji_transliterator) if len(successful) >= 2 else None,
+        "assisted": assisted_results,
+    }
@@ -0,0 +1,220 @@
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+from audio_utils import TARGET_SAMPLING_RATE, as_pipeline_input, decode_audio_bytes
+
+# Urutan tahap pipeline ASR yang diukur
+STAGES = ("decode", "feature_extraction", "encoder", "decoder")
+RSS_SAMPLE_INTERVAL_S = 0.005
+
+
+def get_current_rss_bytes():
+    """RSS proses saat ini dari /proc (Linux); di platform lain memakai puncak RSS dari getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss dalam KB di Linux, dalam byte di macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+class RssSampler:
+    """
+    Mengambil sampel RSS secara berkala di thread latar untuk mencatat puncak memori selama satu tahap.
+    Jika sub-tahap ditandai dengan `set_label`, puncak setiap label juga dicatat di `label_peaks`.
+    """
+
+    def __init__(self, interval_s=RSS_SAMPLE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self.label = None
+        self.label_peaks = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss_bytes = get_current_rss_bytes()
+        with self._lock:
+            self.peak_bytes = max(self.peak_bytes, rss_bytes)
+            if self.label is not None:
+                self.label_peaks[self.label] = max(self.label_peaks.get(self.label, 0), rss_bytes)
+
+    def set_label(self, label):
+        """Mengganti sub-tahap yang sedang diukur; RSS di batas sub-tahap dicatat untuk keduanya."""
+        self._sample()
+        with self._lock:
+            self.label = label
+        self._sample()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(self.interval_s)
+
+    def __enter__(self):
+        self.peak_bytes = get_current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self._sample()
+
+
+class StageProfiler:
+    """
+    Mencatat durasi dan puncak RSS setiap tahap yang dibungkus dengan `stage(nama)`;
+    konteks tersebut menghasilkan RssSampler tahap itu.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        # record_function memberi label tahap pada trace torch profiler (jika sedang aktif)
+        with RssSampler() as sampler, torch.profiler.record_function(name):
+            start_time = time.perf_counter()
+            yield sampler
+            duration = time.perf_counter() - start_time
+        self.stages[name] = {"duration": duration, "peak_rss_mb": sampler.peak_bytes / (1024 * 1024)}
+
+
+# Profiler aktif per thread; hook encoder hanya mencatat waktu dan memori untuk thread yang sedang diprofil,
+# sehingga thread lain yang memakai model yang sama tidak ikut terukur
+_active_profiling = threading.local()
+_encoder_hooks_lock = threading.Lock()
+
+
+def _install_encoder_timing_hooks(model):
+    """
+    Memasang hook waktu dan memori pada encoder model (sekali per model); tanpa profiler aktif hook
+    tidak melakukan apa pun. Selama encoder berjalan, sampler RSS aktif diberi label "encoder",
+    di luar itu "decoder".
+    """
+    with _encoder_hooks_lock:
+        if getattr(model, "_stage_timing_hooks_installed", False):
+            return
+        encoder = model.get_encoder()
+
+        def before_encoder(module, inputs):
+            if getattr(_active_profiling, "encoder_durations", None) is not None:
+                _active_profiling.rss_sampler.set_label("encoder")
+                _active_profiling.encoder_started_at = time.perf_counter()
+
+        def after_encoder(module, inputs, outputs):
+            if getattr(_active_profiling, "encoder_durations", None) is not None:
+                _active_profiling.encoder_durations.append(time.perf_counter() - _active_profiling.encoder_started_at)
+                _active_profiling.rss_sampler.set_label("decoder")
+
+        encoder.register_forward_pre_hook(before_encoder)
+        encoder.register_forward_hook(after_encoder)
+        model._stage_timing_hooks_installed = True
+
+
+def count_generated_tokens(tokenizer, token_ids):
+    """Jumlah token teks yang dihasilkan, tanpa token prompt/khusus (awal transkrip, bahasa, tugas, notimestamps, akhir teks)."""
+    if tokenizer is None:
+        return len(token_ids)
+    excluded_ids = set(tokenizer.all_special_ids) | set(tokenizer.get_added_vocab().values())
+    return sum(1 for token_id in token_ids if token_id not in excluded_ids)
+
+
+def _count_output_tokens(tokenizer, model_output):
+    tokens = model_output.get("tokens")
+    if tokens is None:
+        return 0
+    if not isinstance(tokens, torch.Tensor):
+        tokens = tokens["sequences"]
+    return sum(count_generated_tokens(tokenizer, sequence) for sequence in tokens.reshape(-1, tokens.shape[-1]).tolist())
+
+
+def run_staged_transcription(asr_pipeline, audio, generate_kwargs=None, profiler=None):
+    """
+    Mentranskripsi audio melalui langkah-langkah pipeline yang sama dengan pemanggilan
+    `asr_pipeline(...)` biasa (preprocess -> forward -> postprocess, seperti ChunkPipeline.run_single),
+    sehingga perilakunya identik: audio lebih dari 30 detik memakai decoding long-form
+    (truncation=False dengan attention mask) dan generate memakai konfigurasi generasi gabungan
+    pipeline (mis. beam search bawaan). Setiap langkah diukur: dekode audio, ekstraksi fitur
+    (preprocess), encoder (diukur dengan hook), dan decoder (sisa waktu generate dan postprocess).
+    `audio` berupa bytes file audio, atau dict {"raw", "sampling_rate"} yang sudah didekode
+    (tahap dekode dilewati). Model non-PyTorch (mis. ONNX Runtime) diukur sebagai satu tahap
+    "encoder+decoder". Mengembalikan dict {"text", "num_tokens", "stages"}; `num_tokens` hanya
+    menghitung token teks yang dihasilkan.
+    """
+    profiler = profiler or StageProfiler()
+    model = asr_pipeline.model
+
+    if isinstance(audio, dict):
+        pipeline_input = as_pipeline_input(audio)
+    else:
+        with profiler.stage("decode"):
+            pipeline_input = {"raw": decode_audio_bytes(audio), "sampling_rate": TARGET_SAMPLING_RATE}
+
+    # Parameter digabung dengan cara yang sama seperti Pipeline.__call__
+    preprocess_params, forward_params, postprocess_params = asr_pipeline._sanitize_parameters(generate_kwargs=dict(generate_kwargs or {}))
+    preprocess_params = {**asr_pipeline._preprocess_params, **preprocess_params}
+    forward_params = {**asr_pipeline._forward_params, **forward_params}
+    postprocess_params = {**asr_pipeline._postprocess_params, **postprocess_params}
+
+    with profiler.stage("feature_extraction"):
+        model_inputs = list(asr_pipeline.preprocess(pipeline_input, **preprocess_params))
+
+    timed_encoder = isinstance(model, torch.nn.Module) and hasattr(model, "get_encoder")
+    if timed_encoder:
+        _install_encoder_timing_hooks(model)
+        _active_profiling.encoder_durations = []
+    try:
+        with profiler.stage("encoder+decoder") as sampler:
+            if timed_encoder:
+                _active_profiling.rss_sampler = sampler
+                sampler.set_label("decoder")
+            model_outputs = [asr_pipeline.forward(model_input, **forward_params) for model_input in model_inputs]
+            # Dihitung sebelum postprocess, yang mengambil (pop) token dari keluaran model
+            num_tokens = sum(_count_output_tokens(asr_pipeline.tokenizer, model_output) for model_output in model_outputs)
+            result = asr_pipeline.postprocess(model_outputs, **postprocess_params)
+    finally:
+        encoder_durations = _active_profiling.encoder_durations if timed_encoder else None
+        _active_profiling.encoder_durations = None
+        _active_profiling.rss_sampler = None
+
+    if timed_encoder:
+        # Encoder dipanggil di dalam generate (sekali per jendela 30 detik pada long-form);
+        # sisa waktunya adalah decoding autoregresif dan postprocess. Puncak RSS diambil dari sampel
+        # yang diberi label oleh hook encoder, jadi setiap tahap memiliki puncaknya sendiri
+        combined = profiler.stages.pop("encoder+decoder")
+        encoder_duration = sum(encoder_durations)
+        label_peaks_mb = {label: peak_bytes / (1024 * 1024) for label, peak_bytes in sampler.label_peaks.items()}
+        profiler.stages["encoder"] = {"duration": encoder_duration, "peak_rss_mb": label_peaks_mb.get("encoder", combined["peak_rss_mb"])}
+        profiler.stages["decoder"] = {"duration": max(0.0, combined["duration"] - encoder_duration), "peak_rss_mb": label_peaks_mb.get("decoder", combined["peak_rss_mb"])}
+
+    return {"text": result["text"], "num_tokens": num_tokens, "stages": profiler.stages}
+
+
+def profile_transcription(asr_pipeline, audio, generate_kwargs=None, trace_path=None):
+    """
+    Transkripsi bertahap dengan pengukuran waktu dan memori per tahap. Jika `trace_path` diberikan,
+    seluruh proses juga direkam dengan torch profiler dan disimpan sebagai trace Chrome
+    (bisa dibuka di Perfetto atau chrome://tracing). Mengembalikan hasil `run_staged_transcription`
+    ditambah "duration" (total detik) dan "trace_path".
+    """
+    start_time = time.perf_counter()
+    if trace_path is None:
+        result = run_staged_transcription(asr_pipeline, audio, generate_kwargs)
+    else:
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]) as torch_profiler:
+            result = run_staged_transcription(asr_pipeline, audio, generate_kwargs)
+        torch_profiler.export_chrome_trace(trace_path)
+    result["duration"] = time.perf_counter() - start_time
+    result["trace_path"] = trace_path
+    return result
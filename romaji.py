@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Jumlah segmen (kalimat) yang hasil transliterasinya disimpan di cache LRU
+DEFAULT_ROMAJI_CACHE_SIZE = int(os.environ.get("ASR_ROMAJI_CACHE_SIZE", 8192))
+# Batch dengan segmen baru sebanyak ini atau lebih ditransliterasi paralel di beberapa proses
+PARALLEL_MIN_SEGMENTS = 256
+# Batas jumlah proses transliterasi paralel (proses anak memuat kamus pykakasi masing-masing)
+MAX_PARALLEL_WORKERS = int(os.environ.get("ASR_ROMAJI_MAX_WORKERS", 4))
+# Proses anak dibuat dengan "spawn", bukan fork: proses induk (server Streamlit) memiliki banyak
+# thread (penjadwal, pool OpenMP torch) dan bobot model berukuran GB, sehingga fork berisiko
+# deadlock di proses anak dan pertumbuhan memori copy-on-write
+PROCESS_START_METHOD = "spawn"
+
+# Teks dipotong setelah tanda akhir kalimat/jeda; tanda baca ikut pada segmen sebelumnya
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[。！？!?…\n])")
+# Tanda baca dan spasi diabaikan saat membandingkan teks pada tingkat Romaji
+ROMAJI_NOISE_PATTERN = re.compile(r"[\W_]+")
+
+
+def create_kakasi_converter():
+    """
+    Membuat converter pykakasi Hiragana/Katakana/Kanji -> Romaji (Hepburn).
+    Menggunakan setMode untuk kompatibilitas dengan pykakasi v2.x; ini memicu
+    DeprecationWarning, tapi fungsionalitas tetap berjalan.
+    """
+    import pykakasi
+
+    kks_obj = pykakasi.kakasi()
+    kks_obj.setMode("H", "a") # Hiragana to Alphabet
+    kks_obj.setMode("K", "a") # Katakana to Alphabet
+    kks_obj.setMode("J", "a") # Kanji to Alphabet
+    kks_obj.setMode("r", "Hepburn") # Romaji system (paling umum)
+    return kks_obj.getConverter()
+
+
+def split_sentences(text):
+    """Memecah teks menjadi segmen per kalimat; gabungan semua segmen sama persis dengan teks asli."""
+    return [segment for segment in SENTENCE_BOUNDARY_PATTERN.split(text) if segment]
+
+
+# Converter milik proses pekerja (dibuat sekali per proses oleh initializer)
+_worker_converter = None
+
+
+def _init_worker():
+    global _worker_converter
+    _worker_converter = create_kakasi_converter()
+
+
+def _transliterate_in_worker(segments):
+    return [_worker_converter.do(segment) for segment in segments]
+
+
+class RomajiTransliterator:
+    """
+    Layanan transliterasi Romaji. Teks dipecah per kalimat dan hasil setiap kalimat disimpan
+    di cache LRU, sehingga frasa yang berulang (umum pada dialog anime) tidak ditransliterasi ulang.
+    Converter pykakasi dipakai ulang dari sebuah pool agar aman dipanggil dari beberapa thread.
+    """
+
+    def __init__(self, cache_size=DEFAULT_ROMAJI_CACHE_SIZE, pool_size=2):
+        self.cache_size = cache_size
+        self.initialized = False
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()  # segmen -> romaji
+        self._lock = threading.Lock()
+        self._converters = queue.LifoQueue()
+        try:
+            for _ in range(max(1, pool_size)):
+                self._converters.put(create_kakasi_converter())
+            self.initialized = True
+        except Exception as e:
+            print(f"Peringatan: Gagal menginisialisasi pykakasi untuk transliterasi Romaji: {e}")
+            print("Transliterasi Romaji tidak akan tersedia. Pastikan `pykakasi` terinstal dengan benar.")
+
+    def _cache_get(self, segment):
+        with self._lock:
+            if segment in self._cache:
+                self._cache.move_to_end(segment)
+                self.hits += 1
+                return self._cache[segment]
+            self.misses += 1
+            return None
+
+    def _cache_put(self, segment, romaji_text):
+        with self._lock:
+            self._cache[segment] = romaji_text
+            self._cache.move_to_end(segment)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _convert(self, segments):
+        converter = self._converters.get()
+        try:
+            return [converter.do(segment) for segment in segments]
+        finally:
+            self._converters.put(converter)
+
+    def transliterate(self, text):
+        """Transliterasi satu teks ke Romaji. Jika pykakasi tidak tersedia, teks dikembalikan apa adanya."""
+        return self.transliterate_many([text])[0]
+
+    def transliterate_many(self, texts, max_workers=None):
+        """
+        Transliterasi banyak teks sekaligus (mis. seluruh korpus). Kalimat yang sama hanya
+        ditransliterasi sekali; jika jumlah kalimat baru cukup besar, pekerjaan dibagi ke
+        beberapa proses (`max_workers`, bawaan: jumlah CPU, paling banyak MAX_PARALLEL_WORKERS).
+        """
+        if not self.initialized:
+            return list(texts)
+
+        segmented_texts = [split_sentences(text or "") for text in texts]
+        romaji_by_segment = {}
+        missing_segments = []
+        for segments in segmented_texts:
+            for segment in segments:
+                if segment in romaji_by_segment:
+                    continue
+                romaji_text = self._cache_get(segment)
+                romaji_by_segment[segment] = romaji_text
+                if romaji_text is None:
+                    missing_segments.append(segment)
+
+        if missing_segments:
+            for segment, romaji_text in zip(missing_segments, self._convert_batch(missing_segments, max_workers)):
+                romaji_by_segment[segment] = romaji_text
+                self._cache_put(segment, romaji_text)
+
+        return ["".join(romaji_by_segment[segment] for segment in segments) for segments in segmented_texts]
+
+    def _convert_batch(self, segments, max_workers=None):
+        max_workers = min(max_workers or os.cpu_count() or 1, MAX_PARALLEL_WORKERS)
+        if len(segments) < PARALLEL_MIN_SEGMENTS or max_workers <= 1:
+            return self._convert(segments)
+
+        chunk_size = -(-len(segments) // max_workers)
+        chunks = [segments[start:start + chunk_size] for start in range(0, len(segments), chunk_size)]
+        try:
+            # Pool dibuat per batch dan dimatikan setelahnya, jadi tidak ada proses anak yang
+            # tertinggal selama transliterator hidup (mis. di st.cache_resource)
+            with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+                                     initializer=_init_worker) as process_pool:
+                return [romaji_text for chunk_result in process_pool.map(_transliterate_in_worker, chunks) for romaji_text in chunk_result]
+        except Exception as e:
+            # Mis. lingkungan yang tidak mengizinkan proses anak: lanjutkan di proses ini
+            print(f"Peringatan: Transliterasi paralel gagal ({e}), dilanjutkan tanpa paralelisme.")
+            return self._convert(segments)
+
+    def normalize_for_comparison(self, text):
+        """
+        Romaji huruf kecil tanpa spasi dan tanda baca, untuk menghitung CER pada tingkat Romaji
+        sehingga perbedaan penulisan (Kanji vs Kana) tidak dihitung sebagai kesalahan.
+        """
+        return self.normalize_many_for_comparison([text])[0]
+
+    def normalize_many_for_comparison(self, texts, max_workers=None):
+        return [ROMAJI_NOISE_PATTERN.sub("", romaji_text).lower() for romaji_text in self.transliterate_many(texts, max_workers)]
+
+    def cache_info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "max_size": self.cache_size}
@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import torch
+
+from audio_utils import as_pipeline_input
+
+# Pengaturan bawaan penjadwal (bisa diganti lewat variabel lingkungan)
+DEFAULT_WORKERS_PER_MODEL = int(os.environ.get("ASR_SCHEDULER_WORKERS", 1))
+DEFAULT_MAX_QUEUE_SIZE = int(os.environ.get("ASR_SCHEDULER_QUEUE_SIZE", 8))
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("ASR_SCHEDULER_MAX_BATCH", 4))
+DEFAULT_BATCH_WINDOW_MS = float(os.environ.get("ASR_SCHEDULER_BATCH_WINDOW_MS", 50))
+# Antrean model yang menganggur selama ini (detik) dihentikan agar anggaran thread pekerja lain pulih
+DEFAULT_LANE_IDLE_TIMEOUT_S = float(os.environ.get("ASR_SCHEDULER_LANE_IDLE_S", 30))
+QUEUE_POLL_INTERVAL_S = 0.25
+
+
+class QueueFullError(RuntimeError):
+    """Antrean model sudah penuh; permintaan ditolak agar server tidak kelebihan beban."""
+
+
+class _InferenceJob(Future):
+    """
+    Future untuk satu permintaan transkripsi, sekaligus entri di antrean model. Jika `function`
+    diberikan, pekerjaan ini eksklusif: fungsi dijalankan sendirian pada model tersebut.
+    """
+
+    def __init__(self, lane, audio_inputs, segmented, function=None):
+        super().__init__()
+        self.lane = lane
+        self.audio_inputs = audio_inputs
+        self.segmented = segmented
+        self.function = function
+        self.enqueued_at = time.perf_counter()
+        self.dequeued_at = None
+
+
+class _ModelLane:
+    """Antrean dan thread pekerja untuk satu pasangan (model_id, backend)."""
+
+    def __init__(self, model_id, backend, num_workers, max_queue_size):
+        self.model_id = model_id
+        self.backend = backend
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.workers = []
+        self.running_batches = 0
+        self.exclusive_running = False
+        self.last_active = time.perf_counter()
+        self.retired = False
+
+
+class InferenceScheduler:
+    """
+    Penjadwal inferensi bersama untuk semua sesi. Setiap model memiliki antrean terbatas dan
+    sejumlah thread pekerja; permintaan yang datang berdekatan (dalam `batch_window_ms`)
+    untuk model yang sama digabung menjadi satu batch inferensi. Jika antrean penuh,
+    `submit` menolak permintaan dengan QueueFullError. Thread intra-op torch dibagi rata
+    antar seluruh pekerja di semua model (anggaran tetap per pekerja), sehingga jumlah thread
+    tidak melebihi jumlah inti CPU walaupun semua pekerja berjalan bersamaan. Antrean model yang
+    menganggur lebih dari `lane_idle_timeout_s` dihentikan beserta pekerjanya, sehingga model yang
+    pernah dicoba tidak terus mengurangi anggaran thread model lain. Pengukuran yang
+    memakai model secara langsung (mis. decoding berbantuan) dijalankan lewat `run_exclusive`
+    agar ikut antrean dan tidak berjalan bersamaan dengan batch lain pada model yang sama.
+    """
+
+    def __init__(self, model_registry, workers_per_model=DEFAULT_WORKERS_PER_MODEL, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, batch_window_ms=DEFAULT_BATCH_WINDOW_MS, lane_idle_timeout_s=DEFAULT_LANE_IDLE_TIMEOUT_S):
+        self.model_registry = model_registry
+        self.workers_per_model = workers_per_model
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window_s = batch_window_ms / 1000
+        self.lane_idle_timeout_s = lane_idle_timeout_s
+
+        self._lanes = {}  # (model_id, backend) -> _ModelLane
+        self._lock = threading.Lock()
+        self._total_workers = 0
+        self._shutdown = False
+
+    def _get_lane(self, model_id, backend):
+        lane_key = (model_id, backend or self.model_registry.get_backend(model_id))
+        with self._lock:
+            lane = self._lanes.get(lane_key)
+            if lane is None:
+                # Jumlah pekerja per model bisa diatur di models.json ("workers")
+                num_workers = self.model_registry.get_spec(model_id).get("workers") or self.workers_per_model
+                lane = _ModelLane(lane_key[0], lane_key[1], max(1, num_workers), self.max_queue_size)
+                for worker_index in range(lane.num_workers):
+                    worker = threading.Thread(target=self._worker_loop, args=(lane,), daemon=True, name=f"asr-{lane_key[0]}-{worker_index}")
+                    worker.start()
+                    lane.workers.append(worker)
+                self._lanes[lane_key] = lane
+                self._total_workers += lane.num_workers
+            return lane
+
+    def threads_per_worker(self):
+        """Anggaran thread intra-op torch untuk setiap pekerja: inti CPU dibagi jumlah pekerja semua antrean yang aktif."""
+        with self._lock:
+            return max(1, (os.cpu_count() or 1) // max(1, self._total_workers))
+
+    def submit(self, model_id, audio_input, backend=None):
+        """
+        Memasukkan satu audio ke antrean model. Mengembalikan Future yang berisi dict
+        {"text", "inference_duration", "queue_wait", "batch_size"}. `audio_input` juga boleh berupa
+        list segmen audio (mis. hasil VAD) yang diproses sebagai satu permintaan; hasilnya
+        ditambah "texts" berisi teks per segmen.
+        """
+        segmented = isinstance(audio_input, list)
+        return self._enqueue(model_id, backend, lambda lane: _InferenceJob(lane, audio_input if segmented else [audio_input], segmented))
+
+    def submit_exclusive(self, model_id, function, backend=None):
+        """
+        Memasukkan pekerjaan eksklusif ke antrean model: `function()` dijalankan oleh pekerja model
+        tersebut setelah batch yang sedang berjalan selesai, dan tidak ada batch lain untuk model
+        yang sama selama fungsi berjalan. Antrean penuh ditolak dengan QueueFullError seperti
+        `submit`. Mengembalikan Future berisi nilai kembalian `function`.
+        """
+        return self._enqueue(model_id, backend, lambda lane: _InferenceJob(lane, [], False, function))
+
+    def _enqueue(self, model_id, backend, make_job):
+        while True:
+            lane = self._get_lane(model_id, backend)
+            job = make_job(lane)
+            with lane.condition:
+                if lane.retired:
+                    # Antrean baru saja dihentikan karena menganggur; _get_lane membuat yang baru
+                    continue
+                if len(lane.pending) >= lane.max_queue_size:
+                    raise QueueFullError(f"Antrean model '{lane.model_id}' penuh ({lane.max_queue_size} permintaan). Coba lagi sebentar lagi.")
+                lane.pending.append(job)
+                lane.last_active = time.perf_counter()
+                lane.condition.notify_all()
+            return job
+
+    def queue_position(self, future):
+        """Posisi permintaan di antrean (1 = berikutnya); 0 jika sedang diproses atau sudah selesai."""
+        with future.lane.condition:
+            for position, job in enumerate(future.lane.pending, start=1):
+                if job is future:
+                    return position
+        return 0
+
+    def transcribe(self, model_id, audio_input, backend=None, on_queue_position=None):
+        """
+        Mengantre dan menunggu hasil transkripsi. `on_queue_position(posisi)` dipanggil
+        secara berkala selama permintaan masih menunggu di antrean.
+        """
+        return self._wait(self.submit(model_id, audio_input, backend), on_queue_position)
+
+    def run_exclusive(self, model_id, function, backend=None, on_queue_position=None):
+        """Mengantre pekerjaan eksklusif (lihat `submit_exclusive`) dan menunggu hasilnya."""
+        return self._wait(self.submit_exclusive(model_id, function, backend), on_queue_position)
+
+    def _wait(self, future, on_queue_position=None):
+        while True:
+            try:
+                return future.result(timeout=QUEUE_POLL_INTERVAL_S)
+            except FutureTimeoutError:
+                if on_queue_position is not None:
+                    on_queue_position(self.queue_position(future))
+
+    def stats(self):
+        """Ringkasan antrean per model: list (model_id, backend, jumlah menunggu, jumlah pekerja)."""
+        with self._lock:
+            lanes = list(self._lanes.values())
+        return [(lane.model_id, lane.backend, len(lane.pending), lane.num_workers) for lane in lanes]
+
+    def shutdown(self):
+        self._shutdown = True
+        with self._lock:
+            lanes = list(self._lanes.values())
+        for lane in lanes:
+            with lane.condition:
+                lane.condition.notify_all()
+
+    def _lane_blocked(self, lane):
+        # Pekerjaan eksklusif menunggu semua batch selesai; selama ia berjalan, pekerja lain diam
+        return not lane.pending or lane.exclusive_running or (lane.pending[0].function is not None and lane.running_batches > 0)
+
+    def _next_batch(self, lane):
+        """Batch berikutnya; [] jika tidak ada yang bisa diambil, None jika antrean sudah lama menganggur."""
+        with lane.condition:
+            while self._lane_blocked(lane) and not self._shutdown and not lane.retired:
+                if lane.pending or lane.running_batches > 0:
+                    lane.condition.wait()
+                    continue
+                idle_s = time.perf_counter() - lane.last_active
+                if idle_s >= self.lane_idle_timeout_s:
+                    return None
+                lane.condition.wait(self.lane_idle_timeout_s - idle_s)
+            if self._shutdown or lane.retired:
+                return []
+            if lane.pending[0].function is None:
+                # Tunggu sebentar agar permintaan yang datang berdekatan bisa ikut dalam batch yang sama
+                deadline = lane.pending[0].enqueued_at + self.batch_window_s
+                while len(lane.pending) < self.max_batch_size and time.perf_counter() < deadline:
+                    lane.condition.wait(deadline - time.perf_counter())
+                    if self._lane_blocked(lane):
+                        break
+            batch = []
+            while lane.pending and len(batch) < self.max_batch_size and not lane.exclusive_running:
+                # Pekerjaan eksklusif tidak digabung dengan permintaan lain
+                if lane.pending[0].function is not None and (batch or lane.running_batches > 0):
+                    break
+                job = lane.pending.popleft()
+                job.dequeued_at = time.perf_counter()
+                if job.set_running_or_notify_cancel():
+                    batch.append(job)
+                    lane.exclusive_running = job.function is not None
+            if batch:
+                lane.running_batches += 1
+            return batch
+
+    def _retire_lane(self, lane):
+        with self._lock:
+            with lane.condition:
+                if lane.retired or lane.pending or lane.running_batches > 0 or time.perf_counter() - lane.last_active < self.lane_idle_timeout_s:
+                    return
+                lane.retired = True
+                lane.condition.notify_all()
+            if self._lanes.get((lane.model_id, lane.backend)) is lane:
+                del self._lanes[(lane.model_id, lane.backend)]
+            self._total_workers -= lane.num_workers
+
+    def _worker_loop(self, lane):
+        while not self._shutdown and not lane.retired:
+            batch = self._next_batch(lane)
+            if batch is None:
+                self._retire_lane(lane)
+                continue
+            if not batch:
+                continue
+            try:
+                if batch[0].function is not None:
+                    self._run_exclusive_job(batch[0])
+                else:
+                    self._run_batch(lane, batch)
+            finally:
+                with lane.condition:
+                    lane.running_batches -= 1
+                    lane.exclusive_running = False
+                    lane.last_active = time.perf_counter()
+                    lane.condition.notify_all()
+
+    def _run_exclusive_job(self, job):
+        try:
+            torch.set_num_threads(self.threads_per_worker())
+            result = job.function()
+        except Exception as e:
+            job.set_exception(e)
+            return
+        job.set_result(result)
+
+    def _run_batch(self, lane, batch):
+        try:
+            # Model dimuat saat pertama kali dibutuhkan; waktu muat tidak dihitung sebagai waktu inferensi
+            asr_pipeline = self.model_registry.get_pipeline(lane.model_id, lane.backend)
+            torch.set_num_threads(self.threads_per_worker())
+            start_time_inference = time.perf_counter()
+            pipeline_inputs = [as_pipeline_input(audio_input) for job in batch for audio_input in job.audio_inputs]
+            outputs = list(asr_pipeline(
+                pipeline_inputs,
+                batch_size=min(len(pipeline_inputs), self.max_batch_size),
+                generate_kwargs=self.model_registry.get_generate_kwargs(lane.model_id),
+            )) if pipeline_inputs else []
+            inference_duration = time.perf_counter() - start_time_inference
+        except Exception as e:
+            for job in batch:
+                job.set_exception(e)
+            return
+
+        output_index = 0
+        for job in batch:
+            texts = [output["text"] for output in outputs[output_index:output_index + len(job.audio_inputs)]]
+            output_index += len(job.audio_inputs)
+            result = {
+                "text": texts[0] if not job.segmented else None,
+                "inference_duration": inference_duration,
+                "queue_wait": job.dequeued_at - job.enqueued_at,
+                "batch_size": len(batch),
+            }
+            if job.segmented:
+                result["texts"] = texts
+            job.set_result(result)
@@ -0,0 +1,183 @@
+"""
+Endpoint HTTP lokal untuk perbandingan ASR tanpa Streamlit. Memakai http.server dari pustaka
+standar dengan satu thread per koneksi; inferensi diatur oleh penjadwal bersama sehingga
+permintaan bersamaan diantrekan dan digabung per batch, dan antrean penuh dijawab dengan 503.
+
+Endpoint:
+    GET  /health                      status server, model di memori, dan antrean
+    GET  /models                      daftar model di registry
+    POST /transcribe?models=a,b       body = isi file audio; hasil transkripsi, waktu, dan CER (JSON)
+         &romaji=1                    CER dihitung pada tingkat Romaji
+         &cache=0                     jangan pakai cache hasil transkripsi
+         &vad=1                       buang bagian senyap, transkripsi per segmen ucapan
+         &assisted=1                  ukur juga decoding biasa vs decoding berbantuan (model draf)
+
+Contoh pemakaian:
+    python cli.py serve --port 8000
+    curl --data-binary @contoh.wav "http://127.0.0.1:8000/transcribe?models=openai/whisper-base,litagin/anime-whisper"
+"""
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from comparison import compare_audio, load_audio_input
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Batas ukuran unggahan audio (bisa diganti lewat variabel lingkungan)
+MAX_UPLOAD_BYTES = int(os.environ.get("ASR_SERVER_MAX_UPLOAD_MB", 50)) * 1024 * 1024
+BUSY_RETRY_AFTER_S = 5
+
+
+class BadRequestError(ValueError):
+    """Kesalahan dari sisi klien (audio tidak bisa didekode, parameter tidak valid); dijawab dengan 400."""
+
+
+class ComparisonService:
+    """
+    Objek bersama untuk semua permintaan HTTP: registry model, penjadwal inferensi, cache
+    transkripsi, dan transliterasi Romaji. Hanya konfigurasi yang dibaca saat server dimulai;
+    model dan pykakasi baru dimuat saat pertama kali dibutuhkan.
+    """
+
+    def __init__(self, model_registry=None, use_cache=True):
+        from asr_cache import TranscriptionCache
+        from asr_models import ModelRegistry
+        from scheduler import InferenceScheduler
+
+        self.model_registry = model_registry or ModelRegistry.from_config()
+        self.scheduler = InferenceScheduler(self.model_registry)
+        self.transcription_cache = TranscriptionCache() if use_cache else None
+        self._romaji_transliterator = None
+
+    @property
+    def romaji_transliterator(self):
+        if self._romaji_transliterator is None:
+            from romaji import RomajiTransliterator
+            self._romaji_transliterator = RomajiTransliterator()
+        return self._romaji_transliterator
+
+    def health(self):
+        return {
+            "status": "ok",
+            "loaded_models": [
+                {"id": model_id, "backend": backend, "memory_mb": round(size_mb, 1)}
+                for model_id, backend, size_mb in self.model_registry.loaded_models()
+            ],
+            "queues": [
+                {"id": model_id, "backend": backend, "pending": num_pending, "workers": num_workers}
+                for model_id, backend, num_pending, num_workers in self.scheduler.stats()
+            ],
+        }
+
+    def models(self):
+        return [
+            {"id": spec["id"], "label": spec["label"], "backend": spec["backend"], "default": spec["default"]}
+            for spec in self.model_registry.specs.values()
+        ]
+
+    def transcribe(self, audio_bytes, model_ids=None, romaji=False, use_cache=True, vad=False, assisted=False):
+        unknown_model_ids = [model_id for model_id in model_ids or [] if model_id not in self.model_registry.specs]
+        if unknown_model_ids:
+            raise BadRequestError(f"Model tidak dikenal: {', '.join(unknown_model_ids)}. Lihat GET /models untuk daftar ID yang tersedia.")
+        romaji_transliterator = self.romaji_transliterator if romaji else None
+        if romaji_transliterator is not None and not romaji_transliterator.initialized:
+            raise BadRequestError("Transliterasi Romaji tidak tersedia (pykakasi gagal diinisialisasi); kirim tanpa romaji=1.")
+        try:
+            audio_input = load_audio_input(audio_bytes)
+        except Exception as e:
+            raise BadRequestError(f"Audio tidak dapat didekode ({type(e).__name__}: {e}). Pastikan format file didukung dan tidak korup.") from e
+        return compare_audio(
+            audio_input, model_ids, self.model_registry,
+            transcription_cache=self.transcription_cache if use_cache else None,
+            scheduler=self.scheduler, romaji_transliterator=romaji_transliterator, vad=vad, assisted=assisted,
+        )
+
+
+class ComparisonRequestHandler(BaseHTTPRequestHandler):
+    service = None  # diisi oleh make_server
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif path == "/models":
+            self._send_json(200, self.service.models())
+        else:
+            self._send_json(404, {"error": f"Endpoint tidak dikenal: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/transcribe":
+            self._send_json(404, {"error": f"Endpoint tidak dikenal: {url.path}"})
+            return
+
+        try:
+            content_length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(400, {"error": f"Header Content-Length tidak valid: {self.headers.get('Content-Length')!r}."})
+            return
+        if content_length <= 0:
+            self._send_json(400, {"error": "Body permintaan kosong; kirim isi file audio (mis. curl --data-binary @audio.wav)."})
+            return
+        if content_length > MAX_UPLOAD_BYTES:
+            self._send_json(413, {"error": f"Audio terlalu besar (maksimum {MAX_UPLOAD_BYTES // (1024 * 1024)} MB)."})
+            return
+        audio_bytes = self.rfile.read(content_length)
+
+        query = parse_qs(url.query)
+        model_ids = [model_id for value in query.get("models", []) for model_id in value.split(",") if model_id] or None
+        romaji = query.get("romaji", ["0"])[0] in ("1", "true", "yes")
+        use_cache = query.get("cache", ["1"])[0] not in ("0", "false", "no")
+        vad = query.get("vad", ["0"])[0] in ("1", "true", "yes")
+        assisted = query.get("assisted", ["0"])[0] in ("1", "true", "yes")
+
+        try:
+            result = self.service.transcribe(audio_bytes, model_ids, romaji, use_cache, vad, assisted)
+        except BadRequestError as e:
+            # Audio yang tidak bisa didekode atau parameter yang tidak valid
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # Kesalahan di sisi server (mis. konfigurasi model, kehabisan memori)
+            self.log_error("Gagal memproses /transcribe: %s: %s", type(e).__name__, e)
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        if any(entry.get("error_type") == "QueueFullError" for entry in result["models"] + (result["assisted"] or [])):
+            self._send_json(503, {"error": "Server sedang sibuk, antrean model penuh. Coba lagi sebentar lagi.", **result},
+                            headers={"Retry-After": str(BUSY_RETRY_AFTER_S)})
+            return
+        self._send_json(200, result)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    """Membuat server HTTP (belum berjalan); `service` bawaan dibuat dari models.json."""
+    handler_class = type("BoundComparisonRequestHandler", (ComparisonRequestHandler,), {"service": service or ComparisonService()})
+    return ThreadingHTTPServer((host, port), handler_class)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, use_cache=True):
+    http_server = make_server(host, port, ComparisonService(use_cache=use_cache))
+    print(f"Server perbandingan ASR berjalan di http://{host}:{port} (Ctrl+C untuk berhenti).")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,88 @@
+import time
+
+from audio_utils import iter_audio_chunks
+
+# Perkiraan jumlah karakter Jepang per detik ucapan, untuk membatasi jendela pencarian tumpang tindih
+CHARS_PER_SECOND_ESTIMATE = 10
+MIN_OVERLAP_MATCH_CHARS = 2
+# Jumlah karakter di ujung teks lama / awal teks baru yang boleh dilewati saat mencari bagian berulang
+OVERLAP_EDGE_TOLERANCE_CHARS = 2
+
+
+def merge_overlapping_text(merged_text, chunk_text, max_overlap_chars):
+    """
+    Menyambung teks potongan baru ke teks gabungan. Karena potongan audio saling tumpang tindih,
+    awal teks baru biasanya mengulang akhir teks sebelumnya. Bagian berulang hanya diterima jika
+    berada di ujung teks lama dan di awal teks baru (dengan toleransi beberapa karakter untuk kata
+    yang terpotong di batas potongan); pencocokan di tengah teks diabaikan agar kalimat yang
+    kebetulan mirip tidak ikut terbuang, dan kedua teks langsung disambung.
+    """
+    if not merged_text:
+        return chunk_text
+    if not chunk_text:
+        return merged_text
+
+    best = None  # (panjang, akhir bagian berulang di teks lama, awal bagian berulang di teks baru)
+    for end_skip in range(min(OVERLAP_EDGE_TOLERANCE_CHARS, len(merged_text)) + 1):
+        tail_end = len(merged_text) - end_skip
+        for start_skip in range(min(OVERLAP_EDGE_TOLERANCE_CHARS, len(chunk_text)) + 1):
+            max_size = min(max_overlap_chars, tail_end, len(chunk_text) - start_skip)
+            for size in range(max_size, MIN_OVERLAP_MATCH_CHARS - 1, -1):
+                if best is not None and size <= best[0]:
+                    break
+                if merged_text[tail_end - size:tail_end] == chunk_text[start_skip:start_skip + size]:
+                    best = (size, tail_end, start_skip)
+                    break
+
+    if best is not None:
+        size, tail_end, start_skip = best
+        return merged_text[:tail_end] + chunk_text[start_skip + size:]
+    return merged_text + chunk_text
+
+
+def stream_transcription(asr_pipeline, audio_source, chunk_length_s=30.0, stride_length_s=5.0, generate_kwargs=None):
+    """
+    Transkripsi audio panjang secara streaming: audio didekode per potongan secara lazy dan
+    dialirkan ke pipeline sebagai generator, lalu hasil setiap potongan langsung dikembalikan.
+    Menghasilkan dict {"chunk_index", "start", "end", "chunk_text", "text", "duration"} per potongan,
+    dengan `text` berisi teks gabungan sejauh ini dan `duration` total waktu inferensi kumulatif.
+    """
+    step_s = chunk_length_s - stride_length_s
+    max_overlap_chars = max(MIN_OVERLAP_MATCH_CHARS, int(stride_length_s * CHARS_PER_SECOND_ESTIMATE * 2))
+
+    chunk_durations = []
+
+    def _chunks_with_duration():
+        for chunk in iter_audio_chunks(audio_source, chunk_length_s, stride_length_s):
+            chunk_durations.append(len(chunk["raw"]) / chunk["sampling_rate"])
+            yield chunk
+
+    outputs = iter(asr_pipeline(_chunks_with_duration(), generate_kwargs=generate_kwargs or {}))
+    merged_text = ""
+    inference_duration = 0.0
+    chunk_index = 0
+
+    while True:
+        start_time_chunk = time.perf_counter()
+        try:
+            output = next(outputs)
+        except StopIteration:
+            return
+        inference_duration += time.perf_counter() - start_time_chunk
+
+        chunk_text = output["text"].strip()
+        if stride_length_s > 0:
+            merged_text = merge_overlapping_text(merged_text, chunk_text, max_overlap_chars)
+        else:
+            # Tanpa tumpang tindih tidak ada teks yang berulang, jadi pengulangan nyata (mis. "です" lalu "です") tetap dipertahankan
+            merged_text += chunk_text
+        start = chunk_index * step_s
+        yield {
+            "chunk_index": chunk_index,
+            "start": start,
+            "end": start + chunk_durations[chunk_index],
+            "chunk_text": chunk_text,
+            "text": merged_text,
+            "duration": inference_duration,
+        }
+        chunk_index += 1
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from scheduler import InferenceScheduler, QueueFullError
+
+
+class FakePipeline:
+    """Pipeline palsu: teks = panjang audio dalam sampel; bisa ditahan agar antrean terisi."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+        self.batch_sizes = []
+
+    def __call__(self, inputs, batch_size=None, generate_kwargs=None):
+        self.started.set()
+        self.release.wait(5)
+        self.batch_sizes.append(len(inputs))
+        return [{"text": str(len(pipeline_input["raw"]))} for pipeline_input in inputs]
+
+
+class FakeRegistry:
+    def __init__(self, pipeline, specs=None):
+        self.pipeline = pipeline
+        self.specs = specs or {}
+
+    def get_backend(self, model_id):
+        return "pytorch"
+
+    def get_spec(self, model_id):
+        return self.specs.get(model_id, {})
+
+    def get_pipeline(self, model_id, backend=None):
+        return self.pipeline
+
+    def get_generate_kwargs(self, model_id):
+        return {}
+
+
+def _audio(num_samples):
+    return {"raw": np.zeros(num_samples, dtype=np.float32), "sampling_rate": 16000}
+
+
+@pytest.fixture
+def pipeline():
+    return FakePipeline()
+
+
+def test_requests_within_window_are_batched(pipeline):
+    scheduler = InferenceScheduler(FakeRegistry(pipeline), max_batch_size=4, batch_window_ms=200)
+    futures = [scheduler.submit("model", _audio(num_samples)) for num_samples in (100, 200, 300)]
+    results = [future.result(5) for future in futures]
+    scheduler.shutdown()
+
+    assert [result["text"] for result in results] == ["100", "200", "300"]
+    assert pipeline.batch_sizes == [3]
+    assert all(result["batch_size"] == 3 for result in results)
+
+
+def test_segmented_request_returns_texts(pipeline):
+    scheduler = InferenceScheduler(FakeRegistry(pipeline), batch_window_ms=0)
+    result = scheduler.transcribe("model", [_audio(10), _audio(20)])
+    scheduler.shutdown()
+
+    assert result["text"] is None
+    assert result["texts"] == ["10", "20"]
+
+
+def test_full_queue_rejects_requests(pipeline):
+    scheduler = InferenceScheduler(FakeRegistry(pipeline), max_queue_size=1, max_batch_size=1, batch_window_ms=0)
+    pipeline.release.clear()
+    running = scheduler.submit("model", _audio(1))
+    assert pipeline.started.wait(5)
+    waiting = scheduler.submit("model", _audio(2))
+    assert scheduler.queue_position(waiting) == 1
+    with pytest.raises(QueueFullError):
+        scheduler.submit("model", _audio(3))
+
+    pipeline.release.set()
+    assert running.result(5)["text"] == "1"
+    assert waiting.result(5)["text"] == "2"
+    scheduler.shutdown()
+
+
+def test_thread_budget_is_shared_by_all_workers(pipeline, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 32)
+    scheduler = InferenceScheduler(FakeRegistry(pipeline, {"a": {"workers": 2}}), workers_per_model=1, batch_window_ms=0)
+    scheduler.transcribe("a", _audio(1))
+    scheduler.transcribe("b", _audio(1))
+    scheduler.shutdown()
+
+    assert scheduler.threads_per_worker() == 10
+
+
+def test_thread_budget_recovers_after_idle_lanes_retire(pipeline, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 32)
+    scheduler = InferenceScheduler(FakeRegistry(pipeline), batch_window_ms=0, lane_idle_timeout_s=0.2)
+    for model_id in ("a", "b", "c", "d"):
+        scheduler.transcribe(model_id, _audio(1))
+    assert scheduler.threads_per_worker() == 8
+
+    deadline = time.perf_counter() + 5
+    while scheduler.stats() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert scheduler.stats() == []
+
+    # Antrean yang dihentikan dibuat ulang saat dipakai lagi, dengan anggaran thread penuh
+    assert scheduler.transcribe("a", _audio(5))["text"] == "5"
+    assert scheduler.threads_per_worker() == 32
+    scheduler.shutdown()
+
+
+def test_exclusive_job_never_overlaps_batches(pipeline):
+    scheduler = InferenceScheduler(FakeRegistry(pipeline, {"model": {"workers": 2}}), max_batch_size=1, batch_window_ms=0)
+    pipeline.release.clear()
+    running = scheduler.submit("model", _audio(1))
+    assert pipeline.started.wait(5)
+
+    observed = []
+    exclusive = scheduler.submit_exclusive("model", lambda: observed.append((running.done(), after.running() or after.done())) or "selesai")
+    after = scheduler.submit("model", _audio(2))
+    # Pekerja kedua tidak boleh mengambil pekerjaan eksklusif selama batch pertama berjalan
+    assert scheduler.queue_position(exclusive) == 1
+    assert scheduler.queue_position(after) == 2
+
+    pipeline.release.set()
+    assert running.result(5)["text"] == "1"
+    assert exclusive.result(5) == "selesai"
+    assert after.result(5)["text"] == "2"
+    # Batch sebelumnya sudah selesai dan batch berikutnya belum mulai saat pekerjaan eksklusif berjalan
+    assert observed == [(True, False)]
+    scheduler.shutdown()
+
+
+def test_exclusive_job_respects_queue_limit(pipeline):
+    scheduler = InferenceScheduler(FakeRegistry(pipeline), max_queue_size=1, max_batch_size=1, batch_window_ms=0)
+    pipeline.release.clear()
+    scheduler.submit("model", _audio(1))
+    assert pipeline.started.wait(5)
+    scheduler.submit("model", _audio(2))
+    with pytest.raises(QueueFullError):
+        scheduler.run_exclusive("model", lambda: None)
+    pipeline.release.set()
+    scheduler.shutdown()
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import soundfile as sf
+
+from streaming import merge_overlapping_text, stream_transcription
+
+
+class FakePipeline:
+    """Pipeline palsu yang mengembalikan teks tetap untuk setiap potongan audio."""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def __call__(self, chunks, **kwargs):
+        for chunk, text in zip(chunks, self.texts):
+            yield {"text": text}
+
+
+def _silent_wav(duration_s, sampling_rate=16000):
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(int(duration_s * sampling_rate), dtype=np.float32), sampling_rate, format="WAV")
+    buffer.seek(0)
+    return buffer
+
+
+def test_merge_drops_repeated_overlap():
+    assert merge_overlapping_text("今日はいい天気です", "天気ですね", 10) == "今日はいい天気ですね"
+
+
+def test_merge_without_match_concatenates():
+    assert merge_overlapping_text("こんにちは", "さようなら", 10) == "こんにちはさようなら"
+
+
+def test_merge_handles_empty_texts():
+    assert merge_overlapping_text("", "です", 10) == "です"
+    assert merge_overlapping_text("です", "", 10) == "です"
+
+
+def test_stream_without_stride_keeps_real_repeats():
+    results = list(stream_transcription(FakePipeline(["です", "です", "です"]), _silent_wav(25), chunk_length_s=10, stride_length_s=0))
+    assert results[-1]["text"] == "ですですです"
+    assert [result["start"] for result in results] == [0, 10, 20]
+
+
+def test_stream_with_stride_merges_overlap():
+    results = list(stream_transcription(FakePipeline(["今日はいい天気", "天気ですね"]), _silent_wav(15), chunk_length_s=10, stride_length_s=2))
+    assert results[-1]["text"] == "今日はいい天気ですね"
+
+
+def test_merge_ignores_match_in_middle_of_texts():
+    merged = "今日は学校で先生が宿題を出しました。友達と一緒に帰りました。"
+    chunk = "たね。それから家で宿題をしました。母が夕飯を作りました。"
+    assert merge_overlapping_text(merged, chunk, 80) == merged + chunk
+
+
+def test_merge_tolerates_cut_characters_at_chunk_edges():
+    # Karakter terpotong di akhir teks lama ("え") dan di awal teks baru ("ね。") dilewati
+    assert merge_overlapping_text("友達と一緒に帰りました。え", "一緒に帰りました。それから", 80) == "友達と一緒に帰りました。それから"
+    assert merge_overlapping_text("友達と一緒に帰りました。", "ね。一緒に帰りました。それから", 80) == "友達と一緒に帰りました。それから"
@@ -0,0 +1,43 @@
+import random
+
+import jiwer
+
+from text_diff import align_texts, split_opcodes
+
+
+def _random_text(rng, max_length):
+    return "".join(rng.choice("あいうえおかきくけこ今日天気ですね") for _ in range(rng.randint(1, max_length)))
+
+
+def test_cer_matches_jiwer_on_random_pairs():
+    rng = random.Random(0)
+    for _ in range(200):
+        reference, hypothesis = _random_text(rng, 40), _random_text(rng, 40)
+        assert abs(align_texts(reference, hypothesis)["cer"] - jiwer.cer(reference, hypothesis)) < 1e-9
+
+
+def test_counts_substitutions_deletions_insertions():
+    alignment = align_texts("今日はいい天気", "今日わいい天気です")
+    assert (alignment["substitutions"], alignment["deletions"], alignment["insertions"]) == (1, 0, 2)
+    assert alignment["distance"] == 3
+
+
+def test_cer_is_none_for_empty_reference():
+    assert align_texts("", "です")["cer"] is None
+
+
+def test_split_opcodes_limits_segment_size_and_keeps_coverage():
+    reference = "あ" * 1000 + "い" + "う" * 500
+    hypothesis = "あ" * 1000 + "え" + "う" * 500
+    opcodes = align_texts(reference, hypothesis)["opcodes"]
+    segments = split_opcodes(opcodes, max_ref_chars=100)
+
+    assert all(sum(a_end - a_start for _, a_start, a_end, _, _ in segment) <= 100 for segment in segments)
+    flattened = [opcode for segment in segments for opcode in segment]
+    assert flattened[0][1] == 0 and flattened[-1][2] == len(reference)
+    assert all(previous[2] == current[1] for previous, current in zip(flattened, flattened[1:]))
+    assert [opcode for opcode in flattened if opcode[0] != "equal"] == [opcode for opcode in opcodes if opcode[0] != "equal"]
+
+
+def test_split_opcodes_empty():
+    assert split_opcodes([]) == []
@@ -0,0 +1,59 @@
+import numpy as np
+
+from vad import VAD_MAX_SEGMENT_S, detect_speech_segments, segment_speech
+
+SAMPLING_RATE = 16000
+
+
+def _tone(duration_s, amplitude=0.3, frequency=440.0):
+    t = np.arange(int(duration_s * SAMPLING_RATE)) / SAMPLING_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def _silence(duration_s):
+    return np.zeros(int(duration_s * SAMPLING_RATE), dtype=np.float32)
+
+
+def test_tone_between_silences_is_one_segment():
+    samples = np.concatenate([_silence(2), _tone(3), _silence(2)])
+    segments = detect_speech_segments(samples, SAMPLING_RATE)
+
+    assert len(segments) == 1
+    start, end = segments[0]
+    # Batas segmen berada dalam jarak padding (200 ms) + satu frame dari tepi nada
+    assert abs(start / SAMPLING_RATE - 2.0) < 0.25
+    assert abs(end / SAMPLING_RATE - 5.0) < 0.25
+
+
+def test_separate_tones_give_separate_segments():
+    samples = np.concatenate([_silence(1), _tone(2), _silence(2), _tone(2), _silence(1)])
+    assert len(detect_speech_segments(samples, SAMPLING_RATE)) == 2
+
+
+def test_steady_tone_without_silence_is_whole_clip():
+    samples = _tone(5)
+    assert detect_speech_segments(samples, SAMPLING_RATE) == [(0, len(samples))]
+
+
+def test_digital_silence_has_no_segments():
+    assert detect_speech_segments(_silence(5), SAMPLING_RATE) == []
+    assert detect_speech_segments(np.array([], dtype=np.float32), SAMPLING_RATE) == []
+
+
+def test_long_speech_is_split_below_max_segment_length():
+    samples = _tone(70)
+    segments = detect_speech_segments(samples, SAMPLING_RATE)
+
+    assert len(segments) >= 3
+    assert all((end - start) / SAMPLING_RATE <= VAD_MAX_SEGMENT_S + 0.05 for start, end in segments)
+    assert segments[0][0] == 0 and segments[-1][1] == len(samples)
+
+
+def test_segment_speech_reports_durations():
+    samples = np.concatenate([_silence(2), _tone(3), _silence(5)])
+    speech = segment_speech({"raw": samples, "sampling_rate": SAMPLING_RATE})
+
+    assert len(speech["segments"]) == 1
+    assert speech["total_duration"] == 10.0
+    assert 3.0 <= speech["speech_duration"] < 3.5
+    assert speech["segments"][0]["raw"].base is samples
@@ -0,0 +1,87 @@
+import difflib
+
+try:
+    # Levenshtein terkompilasi (bit-parallel, Hirschberg untuk opcodes) — sudah terpasang sebagai dependensi jiwer
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+# Jumlah maksimum karakter referensi per baris tabel perbedaan
+DIFF_ROW_CHARS = 400
+
+
+def align_texts(ref_text, hyp_text):
+    """
+    Menyejajarkan dua teks karakter demi karakter satu kali saja, lalu menurunkan semua hasil
+    yang dibutuhkan dari penyejajaran yang sama: opcodes untuk penyorotan, jumlah substitusi,
+    penghapusan, dan penambahan karakter, serta CER. Memakai jarak Levenshtein dari rapidfuzz;
+    jika tidak tersedia, memakai difflib (jumlah operasi menjadi perkiraan).
+    Mengembalikan dict {"opcodes", "substitutions", "deletions", "insertions", "distance", "cer"};
+    `cer` bernilai None jika teks acuan kosong.
+    """
+    if Levenshtein is not None:
+        opcodes = [tuple(opcode) for opcode in Levenshtein.opcodes(ref_text, hyp_text)]
+    else:
+        opcodes = difflib.SequenceMatcher(None, ref_text, hyp_text, autojunk=False).get_opcodes()
+
+    substitutions = 0
+    deletions = 0
+    insertions = 0
+    for opcode, a_start, a_end, b_start, b_end in opcodes:
+        ref_length, hyp_length = a_end - a_start, b_end - b_start
+        if opcode == 'replace':
+            substitutions += min(ref_length, hyp_length)
+            deletions += max(0, ref_length - hyp_length)
+            insertions += max(0, hyp_length - ref_length)
+        elif opcode == 'delete':
+            deletions += ref_length
+        elif opcode == 'insert':
+            insertions += hyp_length
+
+    distance = substitutions + deletions + insertions
+    return {
+        "opcodes": opcodes,
+        "substitutions": substitutions,
+        "deletions": deletions,
+        "insertions": insertions,
+        "distance": distance,
+        "cer": distance / len(ref_text) if ref_text else None,
+    }
+
+
+def edit_distance(text1, text2):
+    """Jarak edit tingkat karakter tanpa membentuk opcodes (lebih murah jika hanya angka yang dibutuhkan)."""
+    if Levenshtein is not None:
+        return Levenshtein.distance(text1, text2)
+    return align_texts(text1, text2)["distance"]
+
+
+def split_opcodes(opcodes, max_ref_chars=DIFF_ROW_CHARS):
+    """
+    Membagi opcodes menjadi beberapa segmen berisi paling banyak sekitar `max_ref_chars` karakter
+    (diukur pada teks yang lebih panjang di antara keduanya). Blok 'equal' yang panjang dipotong
+    agar setiap segmen tetap kecil; blok perbedaan tidak pernah dipotong.
+    """
+    segments = []
+    current = []
+    current_chars = 0
+    for opcode, a_start, a_end, b_start, b_end in opcodes:
+        if opcode == 'equal':
+            while a_start < a_end:
+                take = min(a_end - a_start, max(1, max_ref_chars - current_chars))
+                current.append(('equal', a_start, a_start + take, b_start, b_start + take))
+                current_chars += take
+                a_start += take
+                b_start += take
+                if current_chars >= max_ref_chars:
+                    segments.append(current)
+                    current, current_chars = [], 0
+        else:
+            current.append((opcode, a_start, a_end, b_start, b_end))
+            current_chars += max(a_end - a_start, b_end - b_start)
+            if current_chars >= max_ref_chars:
+                segments.append(current)
+                current, current_chars = [], 0
+    if current:
+        segments.append(current)
+    return segments
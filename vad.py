@@ -0,0 +1,134 @@
+import numpy as np
+
+# Parameter deteksi aktivitas suara (VAD) berbasis energi
+VAD_FRAME_MS = 30
+VAD_MIN_SPEECH_MS = 250
+VAD_MIN_SILENCE_MS = 400
+VAD_PADDING_MS = 200
+VAD_MARGIN_DB = 10.0
+VAD_DYNAMIC_RANGE_DB = 45.0
+VAD_ABSOLUTE_MIN_DB = -60.0
+# Whisper memproses paling banyak 30 detik per panggilan, jadi segmen yang lebih panjang dipecah
+VAD_MAX_SEGMENT_S = 28.0
+# Rentang frekuensi ucapan; energi di luar rentang ini (dengung bass, desis) tidak dihitung
+SPEECH_BAND_HZ = (300.0, 3400.0)
+# Jumlah frame yang dianalisis sekaligus, agar memori FFT tetap kecil untuk audio panjang
+FRAMES_PER_BLOCK = 4096
+
+
+def frame_energies_db(samples, sampling_rate, frame_ms=VAD_FRAME_MS):
+    """Energi per frame (dB) pada pita frekuensi ucapan, dihitung per blok frame."""
+    frame_length = max(1, int(sampling_rate * frame_ms / 1000))
+    num_frames = int(np.ceil(len(samples) / frame_length))
+    window = np.hanning(frame_length).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_length, 1 / sampling_rate)
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+
+    energies = np.empty(num_frames, dtype=np.float32)
+    for first_frame in range(0, num_frames, FRAMES_PER_BLOCK):
+        last_frame = min(num_frames, first_frame + FRAMES_PER_BLOCK)
+        block = samples[first_frame * frame_length:last_frame * frame_length]
+        if len(block) < (last_frame - first_frame) * frame_length:
+            block = np.pad(block, (0, (last_frame - first_frame) * frame_length - len(block)))
+        frames = block.reshape(-1, frame_length) * window
+        power = np.abs(np.fft.rfft(frames, axis=1)[:, band]) ** 2
+        energies[first_frame:last_frame] = 10 * np.log10(power.sum(axis=1) / frame_length + 1e-10)
+    return energies, frame_length
+
+
+def _runs(mask):
+    """Rentang (awal, akhir) berturut-turut bernilai True pada array boolean."""
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(changes[::2], changes[1::2]))
+
+
+def detect_speech_segments(samples, sampling_rate, frame_ms=VAD_FRAME_MS, min_speech_ms=VAD_MIN_SPEECH_MS,
+                           min_silence_ms=VAD_MIN_SILENCE_MS, padding_ms=VAD_PADDING_MS, max_segment_s=VAD_MAX_SEGMENT_S):
+    """
+    Mendeteksi bagian ucapan pada waveform mono dengan ambang energi adaptif (lantai derau + margin,
+    dibatasi rentang dinamis dari puncak); audio tanpa bagian senyap yang levelnya di atas
+    `VAD_ABSOLUTE_MIN_DB` dianggap ucapan seluruhnya. Jeda yang lebih pendek dari `min_silence_ms` digabung,
+    potongan yang lebih pendek dari `min_speech_ms` dibuang, setiap segmen diberi padding, dan segmen
+    yang lebih panjang dari `max_segment_s` dipecah pada frame paling senyap.
+    Mengembalikan list (sampel_awal, sampel_akhir) pada audio asli.
+    """
+    if len(samples) == 0:
+        return []
+    energies, frame_length = frame_energies_db(samples, sampling_rate, frame_ms)
+
+    noise_floor = np.percentile(energies, 10)
+    peak = np.percentile(energies, 99)
+    if peak - noise_floor < VAD_MARGIN_DB:
+        # Tidak ada frame yang lebih senyap (mis. nada atau ucapan tanpa jeda): seluruh audio yang
+        # cukup keras dianggap ucapan, bukan dibandingkan dengan lantai derau yang sama kerasnya
+        threshold = VAD_ABSOLUTE_MIN_DB
+    else:
+        threshold = max(noise_floor + VAD_MARGIN_DB, peak - VAD_DYNAMIC_RANGE_DB, VAD_ABSOLUTE_MIN_DB)
+    speech_mask = energies > threshold
+
+    # Isi jeda pendek di antara ucapan agar satu kalimat tidak terpotong
+    min_silence_frames = int(np.ceil(min_silence_ms / frame_ms))
+    speech_runs = _runs(speech_mask)
+    for (_, previous_end), (next_start, _) in zip(speech_runs, speech_runs[1:]):
+        if next_start - previous_end < min_silence_frames:
+            speech_mask[previous_end:next_start] = True
+
+    min_speech_frames = int(np.ceil(min_speech_ms / frame_ms))
+    padding_frames = int(np.ceil(padding_ms / frame_ms))
+    max_segment_frames = max(1, int(max_segment_s * 1000 / frame_ms))
+
+    segments = []
+    for start_frame, end_frame in _runs(speech_mask):
+        if end_frame - start_frame < min_speech_frames:
+            continue
+        start_frame = max(0, start_frame - padding_frames)
+        end_frame = min(len(energies), end_frame + padding_frames)
+        if segments and start_frame <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end_frame)
+        else:
+            segments.append((start_frame, end_frame))
+
+    split_segments = []
+    for start_frame, end_frame in segments:
+        while end_frame - start_frame > max_segment_frames:
+            # Potong pada frame paling senyap di 30% terakhir jendela maksimum
+            search_start = start_frame + int(max_segment_frames * 0.7)
+            cut_frame = search_start + int(np.argmin(energies[search_start:start_frame + max_segment_frames]))
+            split_segments.append((start_frame, cut_frame))
+            start_frame = cut_frame
+        split_segments.append((start_frame, end_frame))
+
+    return [(int(start_frame * frame_length), int(min(len(samples), end_frame * frame_length))) for start_frame, end_frame in split_segments]
+
+
+def segment_speech(audio_input, **vad_kwargs):
+    """
+    Memecah audio hasil dekode ({"raw", "sampling_rate"}) menjadi segmen ucapan. Setiap segmen
+    menunjuk ke buffer audio asli (tanpa salinan) dan menyimpan waktunya pada audio asli.
+    Mengembalikan dict {"segments": [{"start", "end", "raw", "sampling_rate"}], "total_duration",
+    "speech_duration", "speech_ratio"}.
+    """
+    samples, sampling_rate = audio_input["raw"], audio_input["sampling_rate"]
+    segments = [
+        {"start": start / sampling_rate, "end": end / sampling_rate, "raw": samples[start:end], "sampling_rate": sampling_rate}
+        for start, end in detect_speech_segments(samples, sampling_rate, **vad_kwargs)
+    ]
+    total_duration = len(samples) / sampling_rate
+    speech_duration = sum(segment["end"] - segment["start"] for segment in segments)
+    return {
+        "segments": segments,
+        "total_duration": total_duration,
+        "speech_duration": speech_duration,
+        "speech_ratio": speech_duration / total_duration if total_duration > 0 else 0.0,
+    }
+
+
+def segments_signature(speech):
+    """Ringkasan batas segmen untuk kunci cache (hasil transkripsi bergantung pada pemotongan audio)."""
+    return "vad:" + ",".join(f"{segment['start']:.3f}-{segment['end']:.3f}" for segment in speech["segments"])
+
+
+def join_segment_texts(texts):
+    """Teks Jepang tidak memakai spasi antar kalimat, jadi hasil setiap segmen langsung disambung."""
+    return "".join(text.strip() for text in texts)